@@ -2,29 +2,34 @@
 Utility script to test the prediction API
 """
 
-import requests
+import argparse
+import asyncio
+import httpx
+import numpy as np
 import json
 import time
 from datetime import datetime
 
+API_URL = "http://localhost:8000"
 
-def test_health():
+
+async def check_health(client):
     """Test health endpoint"""
-    print("\n=== Testing Health Endpoint ===")
     try:
-        response = requests.get("http://localhost:8000/health")
-        print(f"Status: {response.status_code}")
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
-        return response.status_code == 200
+        response = await client.get("/health")
     except Exception as e:
-        print(f"Error: {e}")
+        print(f"\n=== Testing Health Endpoint ===\nError: {e}")
         return False
+    
+    # Print only after the await so concurrent tests do not interleave output
+    print("\n=== Testing Health Endpoint ===")
+    print(f"Status: {response.status_code}")
+    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    return response.status_code == 200
 
 
-def test_prediction():
+async def check_prediction(client):
     """Test prediction endpoint"""
-    print("\n=== Testing Prediction Endpoint ===")
-    
     data = {
         "close": 150.25,
         "open": 149.80,
@@ -35,22 +40,21 @@ def test_prediction():
     
     try:
         start_time = time.time()
-        response = requests.post("http://localhost:8000/predict", json=data)
+        response = await client.post("/predict", json=data)
         latency = time.time() - start_time
-        
-        print(f"Status: {response.status_code}")
-        print(f"Latency: {latency*1000:.2f} ms")
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
-        return response.status_code == 200
     except Exception as e:
-        print(f"Error: {e}")
+        print(f"\n=== Testing Prediction Endpoint ===\nError: {e}")
         return False
+    
+    print("\n=== Testing Prediction Endpoint ===")
+    print(f"Status: {response.status_code}")
+    print(f"Latency: {latency*1000:.2f} ms")
+    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    return response.status_code == 200
 
 
-def test_batch_prediction():
+async def check_batch_prediction(client):
     """Test batch prediction endpoint"""
-    print("\n=== Testing Batch Prediction Endpoint ===")
-    
     data = [
         {
             "close": 150.25,
@@ -77,120 +81,193 @@ def test_batch_prediction():
     
     try:
         start_time = time.time()
-        response = requests.post("http://localhost:8000/predict/batch", json=data)
+        response = await client.post("/predict/batch", json=data)
         latency = time.time() - start_time
-        
-        print(f"Status: {response.status_code}")
-        print(f"Latency: {latency*1000:.2f} ms")
-        print(f"Predictions: {response.json()['count']}")
-        return response.status_code == 200
     except Exception as e:
-        print(f"Error: {e}")
+        print(f"\n=== Testing Batch Prediction Endpoint ===\nError: {e}")
         return False
+    
+    print("\n=== Testing Batch Prediction Endpoint ===")
+    print(f"Status: {response.status_code}")
+    print(f"Latency: {latency*1000:.2f} ms")
+    if response.status_code == 200:
+        print(f"Predictions: {response.json()['count']}")
+    return response.status_code == 200
 
 
-def test_model_info():
+async def check_model_info(client):
     """Test model info endpoint"""
-    print("\n=== Testing Model Info Endpoint ===")
     try:
-        response = requests.get("http://localhost:8000/model/info")
-        print(f"Status: {response.status_code}")
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
-        return response.status_code == 200
+        response = await client.get("/model/info")
     except Exception as e:
-        print(f"Error: {e}")
+        print(f"\n=== Testing Model Info Endpoint ===\nError: {e}")
         return False
+    
+    print("\n=== Testing Model Info Endpoint ===")
+    print(f"Status: {response.status_code}")
+    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    return response.status_code == 200
 
 
-def test_metrics():
+async def check_metrics(client):
     """Test Prometheus metrics endpoint"""
-    print("\n=== Testing Metrics Endpoint ===")
     try:
-        response = requests.get("http://localhost:8000/metrics")
-        print(f"Status: {response.status_code}")
-        print("Sample metrics:")
-        lines = response.text.split('\n')[:20]
-        for line in lines:
-            if line and not line.startswith('#'):
-                print(f"  {line}")
-        return response.status_code == 200
+        response = await client.get("/metrics")
     except Exception as e:
-        print(f"Error: {e}")
+        print(f"\n=== Testing Metrics Endpoint ===\nError: {e}")
         return False
+    
+    print("\n=== Testing Metrics Endpoint ===")
+    print(f"Status: {response.status_code}")
+    print("Sample metrics:")
+    lines = response.text.split('\n')[:20]
+    for line in lines:
+        if line and not line.startswith('#'):
+            print(f"  {line}")
+    return response.status_code == 200
 
 
-def run_load_test(num_requests=100):
-    """Run a simple load test"""
-    print(f"\n=== Running Load Test ({num_requests} requests) ===")
+async def run_tests(tests):
+    """Run independent endpoint checks concurrently over one client"""
+    async with httpx.AsyncClient(base_url=API_URL, timeout=30.0) as client:
+        results = await asyncio.gather(*[check_func(client) for _, check_func in tests])
     
-    data = {
-        "close": 150.25,
-        "open": 149.80,
-        "high": 151.00,
-        "low": 149.50,
-        "volume": 5000000
-    }
+    return {test_name: result for (test_name, _), result in zip(tests, results)}
+
+
+async def _timed_post(client, semaphore, url, data):
+    """Send one POST request and return (status_code, latency_seconds)"""
+    async with semaphore:
+        req_start = time.perf_counter()
+        response = await client.post(url, json=data)
+        return response.status_code, time.perf_counter() - req_start
+
+
+async def _send_concurrent_requests(url, payloads, concurrency):
+    """Send one POST request per payload with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        return await asyncio.gather(
+            *[_timed_post(client, semaphore, url, data) for data in payloads],
+            return_exceptions=True
+        )
+
+
+def _random_payloads(num_requests, seed=0):
+    """
+    Generate distinct prediction requests around a base price
+    
+    The API caches predictions for repeated inputs, so every request gets
+    its own prices and indicators to measure uncached inference.
+    
+    Args:
+        num_requests: Number of payloads
+        seed: Random seed, for repeatable runs
+    
+    Returns:
+        List of request dictionaries
+    """
+    rng = np.random.default_rng(seed)
+    close = 150.0 + rng.normal(0, 2, num_requests)
+    open_ = close + rng.normal(0, 0.5, num_requests)
+    spread = np.abs(rng.normal(0, 0.5, num_requests))
+    volume = rng.integers(1000000, 10000000, num_requests)
+    returns = rng.normal(0, 0.01, num_requests)
+    volatility = rng.uniform(0.005, 0.03, num_requests)
+    rsi = rng.uniform(20, 80, num_requests)
     
-    latencies = []
+    return [
+        {
+            "close": round(float(close[i]), 4),
+            "open": round(float(open_[i]), 4),
+            "high": round(float(max(close[i], open_[i]) + spread[i]), 4),
+            "low": round(float(min(close[i], open_[i]) - spread[i]), 4),
+            "volume": int(volume[i]),
+            "returns": float(returns[i]),
+            "volatility_5": float(volatility[i]),
+            "rsi": float(rsi[i])
+        }
+        for i in range(num_requests)
+    ]
+
+
+def run_load_test(num_requests=100, concurrency=10):
+    """Run a simple load test with concurrent requests over pooled connections"""
+    print(f"\n=== Running Load Test ({num_requests} requests, concurrency {concurrency}) ===")
+    
+    # Distinct inputs, so the latencies are not prediction cache hits
+    payloads = _random_payloads(num_requests)
+    
+    latencies = np.empty(num_requests)
     successes = 0
     failures = 0
     
     start_time = time.time()
     
-    for i in range(num_requests):
-        try:
-            req_start = time.time()
-            response = requests.post("http://localhost:8000/predict", json=data)
-            req_latency = time.time() - req_start
-            
-            if response.status_code == 200:
-                successes += 1
-                latencies.append(req_latency)
-            else:
-                failures += 1
-                
-        except Exception as e:
+    results = asyncio.run(_send_concurrent_requests(
+        f"{API_URL}/predict", payloads, concurrency
+    ))
+    
+    for result in results:
+        if isinstance(result, Exception):
+            failures += 1
+            continue
+        
+        status_code, req_latency = result
+        if status_code == 200:
+            latencies[successes] = req_latency
+            successes += 1
+        else:
             failures += 1
     
     total_time = time.time() - start_time
     
-    if latencies:
-        avg_latency = sum(latencies) / len(latencies)
-        p95_latency = sorted(latencies)[int(len(latencies) * 0.95)]
+    latencies = latencies[:successes]
+    
+    if successes:
+        avg_latency = latencies.mean()
+        p50_latency, p95_latency, p99_latency = np.percentile(latencies, [50, 95, 99])
         
         print(f"\nResults:")
         print(f"  Total requests: {num_requests}")
+        print(f"  Concurrency: {concurrency}")
         print(f"  Successful: {successes}")
         print(f"  Failed: {failures}")
         print(f"  Total time: {total_time:.2f}s")
         print(f"  Requests/sec: {num_requests/total_time:.2f}")
         print(f"  Avg latency: {avg_latency*1000:.2f} ms")
+        print(f"  P50 latency: {p50_latency*1000:.2f} ms")
         print(f"  P95 latency: {p95_latency*1000:.2f} ms")
+        print(f"  P99 latency: {p99_latency*1000:.2f} ms")
     else:
         print("No successful requests!")
 
 
 def main():
     """Run all tests"""
+    parser = argparse.ArgumentParser(description="Test the prediction API")
+    parser.add_argument("--requests", type=int, default=50, help="Number of load test requests")
+    parser.add_argument("--concurrency", type=int, default=10, help="Maximum in-flight load test requests")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("API Testing Suite")
     print("=" * 60)
     
     tests = [
-        ("Health Check", test_health),
-        ("Single Prediction", test_prediction),
-        ("Batch Prediction", test_batch_prediction),
-        ("Model Info", test_model_info),
-        ("Metrics", test_metrics)
+        ("Health Check", check_health),
+        ("Single Prediction", check_prediction),
+        ("Batch Prediction", check_batch_prediction),
+        ("Model Info", check_model_info),
+        ("Metrics", check_metrics)
     ]
     
-    results = {}
-    for test_name, test_func in tests:
-        results[test_name] = test_func()
-        time.sleep(0.5)
+    results = asyncio.run(run_tests(tests))
     
     # Run load test
-    run_load_test(num_requests=50)
+    run_load_test(num_requests=args.requests, concurrency=args.concurrency)
     
     # Summary
     print("\n" + "=" * 60)
@@ -4,19 +4,23 @@ Serves real-time stock volatility predictions
 """
 
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
-import pandas as pd
+from typing import List, Dict, Optional, Iterable, Tuple
+from functools import lru_cache
 import numpy as np
+import asyncio
 import joblib
 import json
+import orjson
 import os
+import sys
+import time
 from datetime import datetime
-from prometheus_client import Counter, Histogram, Gauge, generate_latest
+from prometheus_client import Counter, Histogram, Gauge, generate_latest, multiprocess
 from prometheus_fastapi_instrumentator import Instrumentator
 from starlette.responses import Response
-import uvicorn
+from sklearn.ensemble import RandomForestRegressor
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -26,7 +30,8 @@ load_dotenv()
 app = FastAPI(
     title="Stock Volatility Prediction API",
     description="Real-time prediction service for stock market volatility",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Prometheus metrics
@@ -42,19 +47,48 @@ prediction_latency = Histogram(
     buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0]
 )
 
+prediction_cache_hits = Counter(
+    'prediction_cache_hits_total',
+    'Number of predictions served from the recent-input cache'
+)
+
 drift_ratio = Gauge(
     'data_drift_ratio',
-    'Ratio of out-of-distribution features'
+    'Ratio of out-of-distribution features',
+    multiprocess_mode='livemostrecent'
 )
 
 model_score = Gauge(
     'model_prediction_score',
-    'Average model prediction score'
+    'Average model prediction score',
+    multiprocess_mode='livemostrecent'
 )
 
 # Instrument app with Prometheus
 Instrumentator().instrument(app).expose(app)
 
+# Default number of uvicorn workers; each one holds its own copy of the model
+DEFAULT_API_WORKERS = 2
+
+# Prometheus multiprocess metric files, wiped when the server starts
+DEFAULT_PROMETHEUS_MULTIPROC_DIR = "/tmp/prometheus_multiproc"
+
+
+def _available_cpus() -> int:
+    """Number of CPUs this process may run on (respects CPU affinity, unlike os.cpu_count)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - not available on macOS/Windows
+        return os.cpu_count() or 1
+
+
+# Grafana alert log, opened once (at startup or on the first alert) and
+# shared by all requests
+ALERT_LOG_DIR = "/app/logs"
+ALERT_LOG_FILE = os.path.join(ALERT_LOG_DIR, "grafana_alerts.log")
+alert_log = None
+alert_log_lock = asyncio.Lock()
+
 
 class PredictionRequest(BaseModel):
     """Request model for predictions"""
@@ -99,63 +133,230 @@ class PredictionResponse(BaseModel):
         }
 
 
+class FlatForest:
+    """
+    Random forest regressor flattened into padded NumPy arrays
+    
+    Walks every tree for every row at once, one vectorized step per tree
+    level. For small inputs this avoids sklearn's per-tree dispatch cost.
+    """
+    
+    def __init__(self, model: RandomForestRegressor):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        n_trees = len(trees)
+        max_nodes = max(tree.node_count for tree in trees)
+        
+        self.feature = np.zeros((n_trees, max_nodes), dtype=np.intp)
+        self.threshold = np.zeros((n_trees, max_nodes))
+        self.left = np.zeros((n_trees, max_nodes), dtype=np.intp)
+        self.right = np.zeros((n_trees, max_nodes), dtype=np.intp)
+        self.value = np.zeros((n_trees, max_nodes))
+        self.max_depth = 0
+        
+        for t, tree in enumerate(trees):
+            n_nodes = tree.node_count
+            nodes = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+            
+            # Leaves point to themselves so extra iterations keep them in place
+            self.feature[t, :n_nodes] = np.where(is_leaf, 0, tree.feature)
+            self.threshold[t, :n_nodes] = tree.threshold
+            self.left[t, :n_nodes] = np.where(is_leaf, nodes, tree.children_left)
+            self.right[t, :n_nodes] = np.where(is_leaf, nodes, tree.children_right)
+            self.value[t, :n_nodes] = tree.value[:, 0, 0]
+            self.max_depth = max(self.max_depth, tree.max_depth)
+        
+        self._trees = np.arange(n_trees)[:, None]
+    
+    @staticmethod
+    def supports(model) -> bool:
+        """Check whether the model can be flattened"""
+        return isinstance(model, RandomForestRegressor) and model.n_outputs_ == 1
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict like RandomForestRegressor.predict (mean of tree outputs)"""
+        trees = self._trees
+        rows = np.arange(X.shape[0])[None, :]
+        node = np.zeros((trees.shape[0], X.shape[0]), dtype=np.intp)
+        
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[trees, node]] <= self.threshold[trees, node]
+            node = np.where(go_left, self.left[trees, node], self.right[trees, node])
+        
+        return self.value[trees, node].mean(axis=0)
+
+
 class ModelService:
     """Model loading and prediction service"""
     
+    # Values used for optional inputs that are not provided
+    FEATURE_DEFAULTS = {
+        'returns': 0.0,
+        'volatility_5': 0.0,
+        'rsi': 50.0
+    }
+    
+    # Request fields that map directly onto model features
+    INPUT_FEATURES = ('close',) + tuple(FEATURE_DEFAULTS)
+    
+    # Number of distinct recent inputs whose predictions are cached
+    PREDICTION_CACHE_SIZE = 1024
+    
+    # Largest batch served by FlatForest; bigger batches use sklearn with all cores
+    FLAT_FOREST_MAX_ROWS = 128
+    
     def __init__(self, model_path: str = "./models"):
         self.model_path = model_path
         self.model = None
+        self._forest = None
         self.scaler = None
+        self._scaler_mean = None
+        self._scaler_inv_scale = None
         self.feature_columns = None
+        self._col_index = {}
+        self._n_features = 0
+        self._input_names = ()
+        self._input_cols = np.empty(0, dtype=np.intp)
         self.model_version = "v1.0.0"
-        self.feature_stats = {}  # For drift detection
+        # Training feature statistics for drift detection
+        self.mean_vec = None
+        self.std_vec = None
         
         self.load_model()
     
     def load_model(self):
         """Load the trained model and scaler"""
+        # Cached predictions belong to the previously loaded model
+        self._cached_predict = lru_cache(maxsize=self.PREDICTION_CACHE_SIZE)(self._predict_values)
+        
+        # Bind counter label children once instead of looking them up per request
+        self._ok_counter = prediction_counter.labels(model_version=self.model_version, status='success')
+        self._err_counter = prediction_counter.labels(model_version=self.model_version, status='error')
+        
         try:
             # Load model
             model_file = os.path.join(self.model_path, "production_model.pkl")
             if not os.path.exists(model_file):
                 model_file = os.path.join(self.model_path, "best_model.pkl")
             
-            self.model = joblib.load(model_file)
+            # Memory-map numpy arrays instead of copying them onto the heap;
+            # requires the artifacts to be saved uncompressed (see train.py)
+            self.model = joblib.load(model_file, mmap_mode='r')
             print(f"✓ Model loaded from: {model_file}")
             
+            # Flatten forests for fast small-batch prediction; large batches
+            # fall back to sklearn's parallel tree evaluation, with the CPUs
+            # split between the server's workers
+            self._forest = None
+            if FlatForest.supports(self.model):
+                self._forest = FlatForest(self.model)
+                self.model.n_jobs = max(1, _available_cpus() // int(os.getenv("API_WORKERS", "1")))
+                print(f"✓ Forest flattened: {len(self.model.estimators_)} trees")
+            
             # Load scaler
             scaler_file = model_file.replace(".pkl", "_scaler.pkl")
-            self.scaler = joblib.load(scaler_file)
+            self.scaler = joblib.load(scaler_file, mmap_mode='r')
             print(f"✓ Scaler loaded from: {scaler_file}")
             
+            # Keep the scaler statistics as float32 so float32 feature arrays
+            # stay float32 through scaling (tree models split on float32)
+            self._scaler_mean = self.scaler.mean_.astype(np.float32)
+            self._scaler_inv_scale = (1.0 / self.scaler.scale_).astype(np.float32)
+            
             # Load feature columns
             features_file = model_file.replace(".pkl", "_features.json")
             with open(features_file, 'r') as f:
                 self.feature_columns = json.load(f)
             print(f"✓ Feature columns loaded: {len(self.feature_columns)} features")
             
+            # Precompute column positions for building feature arrays
+            self._col_index = {col: i for i, col in enumerate(self.feature_columns)}
+            self._n_features = len(self.feature_columns)
+            
+            # Feature columns filled in from request fields; the rest stay 0.0,
+            # so drift is only measured over these
+            self._input_names = tuple(name for name in self.INPUT_FEATURES if name in self._col_index)
+            self._input_cols = np.array([self._col_index[name] for name in self._input_names], dtype=np.intp)
+            
             # Load feature statistics for drift detection
-            self._initialize_feature_stats()
+            self._initialize_feature_stats(model_file.replace(".pkl", "_stats.npz"))
+            
+            # Run a dummy prediction so the first real request is not slow
+            self._warmup()
             
         except Exception as e:
             print(f"⚠️  Warning: Could not load model: {e}")
             print(f"ℹ️  Service will start without a model. Train a model first using Airflow.")
             self.model = None
+            self._forest = None
             self.scaler = None
+            self._scaler_mean = None
+            self._scaler_inv_scale = None
             self.feature_columns = []
+            self._col_index = {}
+            self._n_features = 0
+            self._input_names = ()
+            self._input_cols = np.empty(0, dtype=np.intp)
+            self.mean_vec = None
+            self.std_vec = None
     
-    def _initialize_feature_stats(self):
-        """Initialize feature statistics for drift detection"""
-        # In production, load from training data statistics
-        # For now, use placeholder values
-        self.feature_stats = {
-            'mean': {},
-            'std': {},
-            'min': {},
-            'max': {}
-        }
+    def _initialize_feature_stats(self, stats_file: str):
+        """
+        Load training feature statistics for drift detection
+        
+        Args:
+            stats_file: .npz file with 'mean' and 'std' arrays in feature column order
+        """
+        self.mean_vec = None
+        self.std_vec = None
+        
+        if not os.path.exists(stats_file):
+            print(f"ℹ️  No feature statistics at {stats_file}; drift detection disabled")
+            return
+        
+        with np.load(stats_file) as stats:
+            mean_vec = stats['mean'].astype(np.float32)
+            std_vec = stats['std'].astype(np.float32)
+        
+        if mean_vec.shape != (self._n_features,) or std_vec.shape != (self._n_features,):
+            print("⚠️  Warning: Feature statistics do not match feature columns; drift detection disabled")
+            return
+        
+        self.mean_vec = mean_vec
+        self.std_vec = std_vec
+        print(f"✓ Feature statistics loaded from: {stats_file}")
+    
+    def _warmup(self):
+        """
+        Exercise the prediction path once with dummy inputs
+        
+        Pages in the model arrays and initializes scaler/model internals
+        without touching the Prometheus metrics.
+        """
+        try:
+            dummy = {'close': 0.0, 'open': 0.0, 'high': 0.0, 'low': 0.0, 'volume': 0}
+            features = self.create_features(dummy)
+            self.detect_drift(features, np.ones(len(self._input_names), dtype=bool))
+            features_scaled = self._scale(features)
+            self._model_predict(features_scaled)
+            print("✓ Model warmed up")
+        except Exception as e:
+            print(f"⚠️  Warning: Model warmup failed: {e}")
+    
+    def _scale(self, X: np.ndarray) -> np.ndarray:
+        """Standardize float32 features with the scaler statistics, like scaler.transform"""
+        X_scaled = np.subtract(X, self._scaler_mean, dtype=np.float32)
+        X_scaled *= self._scaler_inv_scale
+        return X_scaled
     
-    def create_features(self, data: Dict) -> pd.DataFrame:
+    def _model_predict(self, X_scaled: np.ndarray) -> np.ndarray:
+        """Run the model on scaled float32 features"""
+        X_scaled = X_scaled.astype(np.float32, copy=False)
+        if self._forest is not None and X_scaled.shape[0] <= self.FLAT_FOREST_MAX_ROWS:
+            return self._forest.predict(X_scaled)
+        return self.model.predict(X_scaled)
+    
+    def create_features(self, data: Dict) -> np.ndarray:
         """
         Create features from input data
         
@@ -163,59 +364,96 @@ class ModelService:
             data: Dictionary with OHLCV data
         
         Returns:
-            DataFrame with engineered features
+            Feature array of shape (1, n_features) in feature column order
         """
-        # Create a simple feature vector
-        # In production, this would use the same feature engineering as training
+        values = {'close': data['close']}
+        for name in self.FEATURE_DEFAULTS:
+            values[name] = data.get(name)
+        
+        return self._features_from_values(values.items())
+    
+    def create_batch_features(self, requests: List[PredictionRequest]) -> np.ndarray:
+        """
+        Create the feature matrix for a batch of requests, one column at a time
         
-        # For demo, create basic features
-        features = {}
+        Args:
+            requests: List of prediction requests
+        
+        Returns:
+            Feature array of shape (n_requests, n_features) in feature column order
+        """
+        n_rows = len(requests)
+        x = np.zeros((n_rows, self._n_features), dtype=np.float32)
         
-        # Price-based features
-        features['close'] = data['close']
-        features['returns'] = data.get('returns', 0.0)
-        features['volatility_5'] = data.get('volatility_5', 0.0)
-        features['rsi'] = data.get('rsi', 50.0)
+        for name in self.INPUT_FEATURES:
+            idx = self._col_index.get(name)
+            if idx is None:
+                continue
+            default = self.FEATURE_DEFAULTS.get(name, 0.0)
+            x[:, idx] = np.fromiter(
+                (default if v is None else v for v in (getattr(r, name) for r in requests)),
+                dtype=np.float32,
+                count=n_rows
+            )
         
-        # Create dummy features for missing ones
-        # In production, maintain a sliding window of historical data
-        for col in self.feature_columns:
-            if col not in features:
-                features[col] = 0.0  # Placeholder
+        return x
+    
+    def _features_from_values(self, values: Iterable[Tuple[str, Optional[float]]]) -> np.ndarray:
+        """Write (name, value) input pairs into a zeroed single-row feature array"""
+        # Create a simple feature vector
+        # In production, this would use the same feature engineering as training
+        # and maintain a sliding window of historical data; other features stay 0.0
+        x = np.zeros((1, self._n_features), dtype=np.float32)
         
-        # Ensure correct order
-        df = pd.DataFrame([features])[self.feature_columns]
+        for name, value in values:
+            idx = self._col_index.get(name)
+            if idx is not None:
+                x[0, idx] = self.FEATURE_DEFAULTS.get(name, 0.0) if value is None else value
         
-        return df
+        return x
     
-    def detect_drift(self, features: pd.DataFrame) -> float:
+    def detect_drift(self, features: np.ndarray, supplied: np.ndarray) -> float:
         """
         Detect data drift by checking if features are out of expected range
         
         Args:
-            features: Input features
+            features: Input feature array of shape (1, n_features)
+            supplied: Boolean flags, one per name in _input_names, marking
+                the fields the request provided
         
         Returns:
             Drift ratio (0-1)
         """
-        if not self.feature_stats or not self.feature_stats.get('mean'):
-            return 0.0
+        return float(self.detect_drift_many(features, supplied[None, :])[0])
+    
+    def detect_drift_many(self, X: np.ndarray, supplied: np.ndarray) -> np.ndarray:
+        """
+        Detect data drift for every row of a feature matrix
+        
+        Only features taken from provided request fields are checked;
+        defaulted and never-supplied features are not evidence of drift.
         
-        # Count features outside 3 standard deviations
-        out_of_range = 0
-        total = len(features.columns)
+        Args:
+            X: Unscaled feature matrix (N x F) in feature column order
+            supplied: Boolean matrix (N x len(_input_names)) marking the
+                fields each request provided
         
-        for col in features.columns:
-            if col in self.feature_stats['mean']:
-                mean = self.feature_stats['mean'][col]
-                std = self.feature_stats['std'][col]
-                value = features[col].values[0]
-                
-                if abs(value - mean) > 3 * std:
-                    out_of_range += 1
+        Returns:
+            Array of drift ratios (0-1), one per row
+        """
+        if self.mean_vec is None or len(self._input_cols) == 0:
+            return np.zeros(X.shape[0])
         
-        drift = out_of_range / total if total > 0 else 0.0
-        return drift
+        # Fraction of supplied features outside 3 standard deviations
+        cols = self._input_cols
+        out_of_range = np.abs(X[:, cols] - self.mean_vec[cols]) > 3 * self.std_vec[cols]
+        n_supplied = supplied.sum(axis=1)
+        return np.divide(
+            (out_of_range & supplied).sum(axis=1),
+            n_supplied,
+            out=np.zeros(X.shape[0]),
+            where=n_supplied > 0
+        )
     
     def predict(self, data: Dict) -> Dict:
         """
@@ -227,39 +465,73 @@ class ModelService:
         Returns:
             Prediction result dictionary
         """
-        start_time = datetime.now()
+        key = (data['close'],) + tuple(data.get(name) for name in self.FEATURE_DEFAULTS)
+        return self._predict_key(key)
+    
+    def predict_request(self, request: PredictionRequest) -> Dict:
+        """
+        Make a prediction from a validated request
+        
+        Args:
+            request: Prediction request with stock data
+        
+        Returns:
+            Prediction result dictionary
+        """
+        return self._predict_key(tuple(getattr(request, name) for name in self.INPUT_FEATURES))
+    
+    def _predict_values(self, key: Tuple) -> Tuple[float, float]:
+        """
+        Compute (prediction, drift) for one input
+        
+        Args:
+            key: Values of INPUT_FEATURES, in order (None for missing optionals)
+        
+        Returns:
+            Tuple of (prediction, drift ratio)
+        """
+        # Create features
+        values = dict(zip(self.INPUT_FEATURES, key))
+        features = self._features_from_values(values.items())
+        
+        # Detect drift over the fields this request provided
+        supplied = np.array([values[name] is not None for name in self._input_names], dtype=bool)
+        drift = self.detect_drift(features, supplied)
+        
+        # Scale features
+        features_scaled = self._scale(features)
+        
+        # Make prediction
+        prediction = self._model_predict(features_scaled)[0]
+        
+        return float(prediction), drift
+    
+    def _predict_key(self, key: Tuple) -> Dict:
+        """Predict a single input, reusing the cached result for repeated inputs"""
+        start_ns = time.perf_counter_ns()
         
         try:
-            # Create features
-            features = self.create_features(data)
+            hits = self._cached_predict.cache_info().hits
+            prediction, drift = self._cached_predict(key)
+            if self._cached_predict.cache_info().hits > hits:
+                prediction_cache_hits.inc()
             
-            # Detect drift
-            drift = self.detect_drift(features)
             drift_ratio.set(drift)
             
-            # Scale features
-            features_scaled = self.scaler.transform(features)
-            
-            # Make prediction
-            prediction = self.model.predict(features_scaled)[0]
-            
             # Calculate latency
-            latency = (datetime.now() - start_time).total_seconds()
+            latency = (time.perf_counter_ns() - start_ns) / 1e9
             prediction_latency.observe(latency)
             
             # Update metrics
-            prediction_counter.labels(
-                model_version=self.model_version,
-                status='success'
-            ).inc()
+            self._ok_counter.inc()
             
-            model_score.set(float(prediction))
+            model_score.set(prediction)
             
             # Calculate confidence (placeholder - in production, use proper methods)
             confidence = max(0.5, 1.0 - drift)
             
             result = {
-                'prediction': float(prediction),
+                'prediction': prediction,
                 'timestamp': datetime.now().isoformat(),
                 'model_version': self.model_version,
                 'confidence_score': float(confidence),
@@ -270,10 +542,67 @@ class ModelService:
             return result
             
         except Exception as e:
-            prediction_counter.labels(
-                model_version=self.model_version,
-                status='error'
-            ).inc()
+            self._err_counter.inc()
+            raise e
+    
+    def predict_many(self, requests: List[PredictionRequest]) -> List[Dict]:
+        """
+        Make predictions for a batch of requests with a single model call
+        
+        Args:
+            requests: List of prediction requests
+        
+        Returns:
+            List of prediction result dictionaries (same order as input)
+        """
+        if not requests:
+            return []
+        
+        start_ns = time.perf_counter_ns()
+        
+        try:
+            # Build the full N x F feature matrix
+            X = self.create_batch_features(requests)
+            
+            # Detect drift per row, over the fields each request provided
+            supplied = np.array(
+                [[getattr(r, name) is not None for name in self._input_names] for r in requests],
+                dtype=bool
+            ).reshape(len(requests), len(self._input_names))
+            drifts = self.detect_drift_many(X, supplied)
+            drift_ratio.set(float(drifts.mean()))
+            
+            # Scale and predict the whole batch at once
+            X_scaled = self._scale(X)
+            predictions = self._model_predict(X_scaled)
+            
+            # Calculate latency
+            latency = (time.perf_counter_ns() - start_ns) / 1e9
+            prediction_latency.observe(latency)
+            
+            # Update metrics
+            self._ok_counter.inc(len(requests))
+            
+            model_score.set(float(predictions.mean()))
+            
+            # Calculate confidence (placeholder - in production, use proper methods)
+            confidences = np.maximum(0.5, 1.0 - drifts)
+            
+            timestamp = datetime.now().isoformat()
+            return [
+                {
+                    'prediction': float(prediction),
+                    'timestamp': timestamp,
+                    'model_version': self.model_version,
+                    'confidence_score': float(confidence),
+                    'latency_ms': latency * 1000,
+                    'drift_detected': bool(drift > 0.1)
+                }
+                for prediction, confidence, drift in zip(predictions, confidences, drifts)
+            ]
+            
+        except Exception as e:
+            self._err_counter.inc(len(requests))
             raise e
 
 
@@ -281,6 +610,39 @@ class ModelService:
 model_service = ModelService()
 
 
+def _open_alert_log():
+    """Open the alert log file in line-buffered append mode"""
+    global alert_log
+    os.makedirs(ALERT_LOG_DIR, exist_ok=True)
+    alert_log = open(ALERT_LOG_FILE, "a", buffering=1)
+    return alert_log
+
+
+@app.on_event("startup")
+async def open_alert_log():
+    """Open the alert log up front so the first alert does not pay for it"""
+    try:
+        _open_alert_log()
+    except OSError as e:
+        print(f"⚠️  Warning: Could not open alert log {ALERT_LOG_FILE}: {e}")
+
+
+@app.on_event("shutdown")
+async def mark_metrics_process_dead():
+    """Drop this worker's live gauge values from the multiprocess metrics"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+@app.on_event("shutdown")
+async def close_alert_log():
+    """Close the alert log file"""
+    global alert_log
+    if alert_log is not None:
+        alert_log.close()
+        alert_log = None
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -313,11 +675,8 @@ async def predict(request: PredictionRequest):
         Prediction response
     """
     try:
-        # Convert request to dict
-        data = request.dict()
-        
         # Make prediction
-        result = model_service.predict(data)
+        result = model_service.predict_request(request)
         
         return PredictionResponse(**result)
         
@@ -337,11 +696,7 @@ async def predict_batch(requests: List[PredictionRequest]):
         List of predictions
     """
     try:
-        results = []
-        for req in requests:
-            data = req.dict()
-            result = model_service.predict(data)
-            results.append(result)
+        results = model_service.predict_many(requests)
         
         return {"predictions": results, "count": len(results)}
         
@@ -376,21 +731,19 @@ async def receive_alert(request: Request):
         alert_data = await request.json()
         
         # Log alert to file
-        log_dir = "/app/logs"
-        os.makedirs(log_dir, exist_ok=True)
-        log_file = os.path.join(log_dir, "grafana_alerts.log")
-        
         timestamp = datetime.now().isoformat()
         log_entry = f"\n{'='*80}\n"
         log_entry += f"[{timestamp}] GRAFANA ALERT RECEIVED\n"
         log_entry += f"{'-'*80}\n"
-        log_entry += json.dumps(alert_data, indent=2)
+        log_entry += orjson.dumps(alert_data, option=orjson.OPT_INDENT_2).decode()
         log_entry += f"\n{'='*80}\n"
         
-        with open(log_file, "a") as f:
-            f.write(log_entry)
+        async with alert_log_lock:
+            # Opened lazily when startup did not run or could not open it
+            log = alert_log if alert_log is not None else _open_alert_log()
+            log.write(log_entry)
         
-        print(f"⚠️  Alert received and logged to {log_file}")
+        print(f"⚠️  Alert received and logged to {ALERT_LOG_FILE}")
         
         return {
             "status": "received",
@@ -407,9 +760,34 @@ async def receive_alert(request: Request):
 
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
+    # DEV enables hot reload, which requires a single worker
+    dev_mode = bool(os.getenv("DEV"))
+    workers = 1 if dev_mode else int(os.getenv("API_WORKERS", min(DEFAULT_API_WORKERS, _available_cpus())))
+    os.environ["API_WORKERS"] = str(workers)
+    
+    # Worker processes keep separate metric values; Prometheus multiprocess
+    # mode lets /metrics aggregate them (must be set before workers start).
+    # Files left by a previous run would be aggregated too, so they are removed.
+    if workers > 1:
+        os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", DEFAULT_PROMETHEUS_MULTIPROC_DIR)
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        with os.scandir(metrics_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".db"):
+                    os.remove(entry.path)
+    
+    # Hand over to the uvicorn CLI rather than calling uvicorn.run("app:app")
+    # here: workers and the reloader import "app:app" themselves, and spawned
+    # processes would also re-execute this file, registering metrics twice
+    args = [
+        sys.executable, "-m", "uvicorn", "app:app",
+        "--app-dir", os.path.dirname(os.path.abspath(__file__)),
+        "--host", "0.0.0.0",
+        "--port", "8000",
+        "--loop", "uvloop",
+        "--http", "httptools",
+    ]
+    args += ["--reload"] if dev_mode else ["--workers", str(workers)]
+    os.execv(sys.executable, args)
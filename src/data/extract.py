@@ -4,34 +4,259 @@ Fetches time-series data from Alpha Vantage API
 """
 
 import os
+import asyncio
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from datetime import date, datetime, timedelta
 import json
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 import time
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is optional outside the API image
+    _json_loads = json.loads
+
+try:
+    from redis.exceptions import RedisError
+except ImportError:  # pragma: no cover - the response cache is optional
+    RedisError = OSError
+
 load_dotenv()
 
 
 class DataExtractor:
     """Extract stock market data from Alpha Vantage API"""
     
-    def __init__(self, api_key: Optional[str] = None, symbol: str = "AAPL"):
+    # Responses for a trading day do not change after the close
+    CACHE_TTL_SECONDS = 86400
+    
+    # Fixed per-row schema of Alpha Vantage TIME_SERIES_* payloads
+    PRICE_FIELDS = (('open', '1. open'), ('high', '2. high'), ('low', '3. low'), ('close', '4. close'))
+    VOLUME_FIELD = '5. volume'
+    
+    def __init__(self, api_key: Optional[str] = None, symbol: str = "AAPL", cache: Optional[Any] = None):
         """
         Initialize the data extractor
         
         Args:
             api_key: Alpha Vantage API key
             symbol: Stock symbol to fetch data for
+            cache: Optional redis.Redis client used to cache raw API responses
         """
         self.api_key = api_key or os.getenv("ALPHA_VANTAGE_API_KEY")
         self.symbol = symbol
+        self.cache = cache
         self.base_url = "https://www.alphavantage.co/query"
+        # Alpha Vantage free tier: keep at most this many requests in flight
+        self.max_concurrent_requests = 5
         
         if not self.api_key:
             raise ValueError("API key not provided. Set ALPHA_VANTAGE_API_KEY environment variable.")
+        
+        # Reuse connections across fetches and retry transient failures
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+    
+    def close(self) -> None:
+        """Close pooled HTTP connections"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    @staticmethod
+    def _cache_key(params: Dict) -> str:
+        """
+        Build the response cache key for a request
+        
+        Args:
+            params: Query parameters of the request
+        
+        Returns:
+            Key of the form av:{function}:{symbol}:{interval}:{outputsize}:{date}
+        """
+        return (
+            f"av:{params['function']}:{params['symbol']}:{params.get('interval', 'daily')}:"
+            f"{params['outputsize']}:{date.today()}"
+        )
+    
+    def _cache_get(self, key: str) -> Optional[bytes]:
+        """
+        Look up a cached response, treating cache failures as misses
+        
+        Args:
+            key: Response cache key
+        
+        Returns:
+            Raw response body, or None on a miss
+        """
+        if self.cache is None:
+            return None
+        
+        try:
+            cached = self.cache.get(key)
+            self.cache.incr("av:cache:hits" if cached is not None else "av:cache:misses")
+            return cached
+        except RedisError as e:
+            print(f"⚠️  Response cache unavailable: {e}")
+            return None
+    
+    def _cache_set(self, key: str, content: bytes) -> None:
+        """
+        Store a validated response body in the cache
+        
+        Args:
+            key: Response cache key
+            content: Raw response body
+        """
+        if self.cache is None:
+            return
+        
+        try:
+            self.cache.setex(key, self.CACHE_TTL_SECONDS, content)
+        except RedisError as e:
+            print(f"⚠️  Response cache unavailable: {e}")
+    
+    @staticmethod
+    def _parse_time_series(time_series: Dict) -> pd.DataFrame:
+        """
+        Convert an Alpha Vantage time series payload into an OHLCV DataFrame
+        
+        The payload schema is fixed, so each column is parsed straight into a
+        typed array and the index from its ISO keys, with no schema or format
+        inference and no intermediate object-dtype columns.
+        
+        Args:
+            time_series: Mapping of timestamp -> {"1. open": ..., "5. volume": ...}
+        
+        Returns:
+            DataFrame with open/high/low/close/volume columns, sorted by time
+        """
+        n = len(time_series)
+        rows = time_series.values()
+        
+        try:
+            columns = {
+                name: np.fromiter((float(row[key]) for row in rows), dtype=np.float64, count=n)
+                for name, key in DataExtractor.PRICE_FIELDS
+            }
+            columns['volume'] = np.fromiter(
+                (int(row[DataExtractor.VOLUME_FIELD]) for row in rows), dtype=np.int64, count=n
+            )
+            
+            # Keys are always ISO "YYYY-MM-DD[ HH:MM:SS]"; NumPy parses them
+            # directly without pandas' per-call format inference
+            index = pd.DatetimeIndex(
+                np.array(list(time_series.keys()), dtype='datetime64[s]').astype('datetime64[ns]')
+            )
+        except (KeyError, TypeError, ValueError):
+            # Malformed or missing values: fall back to coercing them to NaN
+            # column by column, selecting the fields by key so absent or
+            # extra keys cannot shift the columns
+            names = {key: name for name, key in DataExtractor.PRICE_FIELDS}
+            names[DataExtractor.VOLUME_FIELD] = 'volume'
+            df = pd.DataFrame.from_dict(time_series, orient='index').reindex(columns=list(names))
+            df = df.rename(columns=names)
+            df.index = pd.to_datetime(df.index)
+            for col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+            return DataExtractor._downcast(df).sort_index()
+        
+        df = pd.DataFrame(columns, index=index)
+        return DataExtractor._downcast(df).sort_index()
+    
+    @staticmethod
+    def _downcast(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Store prices as float32 and volume as uint32 where the values allow it
+        
+        float32 keeps ~7 significant digits, well beyond tick precision, and
+        halves the memory every downstream feature computation has to read.
+        
+        Args:
+            df: OHLCV DataFrame with float64 prices
+        
+        Returns:
+            The same DataFrame with narrowed column dtypes
+        """
+        price_columns = ['open', 'high', 'low', 'close']
+        df[price_columns] = df[price_columns].astype(np.float32)
+        
+        # Keep the original dtype if volume has gaps, negatives or overflows uint32
+        volume = df['volume']
+        if (
+            pd.api.types.is_integer_dtype(volume)
+            and (volume.empty or (volume.min() >= 0 and volume.max() <= np.iinfo(np.uint32).max))
+        ):
+            df['volume'] = volume.astype(np.uint32)
+        
+        return df
+    
+    @staticmethod
+    def _check_api_errors(data: Dict) -> None:
+        """
+        Raise if an Alpha Vantage response carries an error instead of data
+        
+        Args:
+            data: Decoded JSON response
+        """
+        if "Error Message" in data:
+            raise ValueError(f"API Error: {data['Error Message']}")
+        
+        if "Note" in data:
+            raise ValueError(f"API Rate Limit: {data['Note']}")
+        
+        if "Information" in data:
+            raise ValueError(f"API Information: {data['Information']}. Check your API key or rate limits.")
+    
+    def _intraday_frame(self, data: Dict, interval: str, symbol: str) -> pd.DataFrame:
+        """
+        Validate an intraday API response and convert it to a DataFrame
+        
+        Args:
+            data: Decoded JSON response
+            interval: Time interval the data was requested with
+            symbol: Stock symbol the data belongs to
+        
+        Returns:
+            DataFrame with stock data
+        """
+        # Check for API errors
+        self._check_api_errors(data)
+        
+        # Extract time series data
+        time_series_key = f"Time Series ({interval})"
+        if time_series_key not in data:
+            raise ValueError(f"Unexpected API response structure: {list(data.keys())}. Response: {data}")
+        
+        time_series = data[time_series_key]
+        
+        # Convert to DataFrame
+        df = self._parse_time_series(time_series)
+        
+        # Add metadata
+        df['symbol'] = symbol
+        df['fetch_timestamp'] = datetime.now()
+        
+        return df
     
     def fetch_intraday_data(self, interval: str = "60min", outputsize: str = "full") -> pd.DataFrame:
         """
@@ -53,48 +278,117 @@ class DataExtractor:
             "datatype": "json"
         }
         
+        cache_key = self._cache_key(params)
+        content = self._cache_get(cache_key)
+        from_cache = content is not None
+        
         try:
-            response = requests.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Check for API errors
-            if "Error Message" in data:
-                raise ValueError(f"API Error: {data['Error Message']}")
-            
-            if "Note" in data:
-                raise ValueError(f"API Rate Limit: {data['Note']}")
-            
-            if "Information" in data:
-                raise ValueError(f"API Information: {data['Information']}. Check your API key or rate limits.")
-            
-            # Extract time series data
-            time_series_key = f"Time Series ({interval})"
-            if time_series_key not in data:
-                raise ValueError(f"Unexpected API response structure: {list(data.keys())}. Response: {data}")
+            if not from_cache:
+                response = self.session.get(self.base_url, params=params, timeout=30)
+                response.raise_for_status()
+                content = response.content
+            data = _json_loads(content)
             
-            time_series = data[time_series_key]
-            
-            # Convert to DataFrame
-            df = pd.DataFrame.from_dict(time_series, orient='index')
-            df.index = pd.to_datetime(df.index)
-            df = df.sort_index()
-            
-            # Rename columns
-            df.columns = ['open', 'high', 'low', 'close', 'volume']
-            
-            # Convert to numeric
-            for col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            # Add metadata
-            df['symbol'] = self.symbol
-            df['fetch_timestamp'] = datetime.now()
-            
-            return df
+            df = self._intraday_frame(data, interval, self.symbol)
             
         except requests.exceptions.RequestException as e:
             raise RuntimeError(f"Failed to fetch data from API: {str(e)}")
+        
+        # Only cache responses that parsed into data, never API error notes
+        if not from_cache:
+            self._cache_set(cache_key, content)
+        return df
+    
+    async def _fetch_one(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore,
+                         symbol: str, params: Dict, interval: str) -> pd.DataFrame:
+        """
+        Fetch and parse intraday data for one symbol on a shared async client
+        
+        Args:
+            client: Async HTTP client shared by all symbols
+            semaphore: Guard limiting the number of in-flight requests
+            symbol: Stock symbol to fetch
+            params: Query parameters without the symbol
+            interval: Time interval (1min, 5min, 15min, 30min, 60min)
+        
+        Returns:
+            DataFrame with stock data for the symbol
+        """
+        params = {**params, "symbol": symbol}
+        cache_key = self._cache_key(params)
+        
+        # The cache client is synchronous, so its round-trips run in worker
+        # threads instead of blocking the other fetches on the event loop
+        cached = None
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self._cache_get, cache_key)
+        if cached is not None:
+            return self._intraday_frame(_json_loads(cached), interval, symbol)
+        
+        async with semaphore:
+            response = await client.get(self.base_url, params=params)
+        response.raise_for_status()
+        
+        df = self._intraday_frame(_json_loads(response.content), interval, symbol)
+        if self.cache is not None:
+            await asyncio.to_thread(self._cache_set, cache_key, response.content)
+        return df
+    
+    async def fetch_intraday_many_async(self, symbols: List[str], interval: str = "60min",
+                                        outputsize: str = "full") -> Dict[str, pd.DataFrame]:
+        """
+        Fetch intraday data for several symbols concurrently
+        
+        Requests overlap on one event loop, so wall time is bounded by the
+        slowest response rather than the sum of all of them.
+        
+        Args:
+            symbols: Stock symbols to fetch
+            interval: Time interval (1min, 5min, 15min, 30min, 60min)
+            outputsize: 'compact' (latest 100 data points) or 'full' (full-length time series)
+        
+        Returns:
+            Mapping of symbol -> DataFrame for every symbol fetched successfully
+        """
+        params = {
+            "function": "TIME_SERIES_INTRADAY",
+            "interval": interval,
+            "apikey": self.api_key,
+            "outputsize": outputsize,
+            "datatype": "json"
+        }
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        limits = httpx.Limits(max_connections=self.max_concurrent_requests)
+        
+        async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+            results = await asyncio.gather(
+                *[self._fetch_one(client, semaphore, symbol, params, interval) for symbol in symbols],
+                return_exceptions=True
+            )
+        
+        frames = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                print(f"⚠️  Failed to fetch data for {symbol}: {result}")
+                continue
+            frames[symbol] = result
+        
+        return frames
+    
+    def fetch_intraday_many(self, symbols: List[str], interval: str = "60min",
+                            outputsize: str = "full") -> Dict[str, pd.DataFrame]:
+        """
+        Synchronous wrapper around fetch_intraday_many_async
+        
+        Args:
+            symbols: Stock symbols to fetch
+            interval: Time interval (1min, 5min, 15min, 30min, 60min)
+            outputsize: 'compact' (latest 100 data points) or 'full' (full-length time series)
+        
+        Returns:
+            Mapping of symbol -> DataFrame for every symbol fetched successfully
+        """
+        return asyncio.run(self.fetch_intraday_many_async(symbols, interval, outputsize))
     
     def fetch_daily_data(self, outputsize: str = "full") -> pd.DataFrame:
         """
@@ -114,57 +408,85 @@ class DataExtractor:
             "datatype": "json"
         }
         
+        cache_key = self._cache_key(params)
+        content = self._cache_get(cache_key)
+        from_cache = content is not None
+        
         try:
-            response = requests.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            if not from_cache:
+                response = self.session.get(self.base_url, params=params, timeout=30)
+                response.raise_for_status()
+                content = response.content
+            data = _json_loads(content)
             
-            if "Error Message" in data:
-                raise ValueError(f"API Error: {data['Error Message']}")
-            
-            if "Note" in data:
-                raise ValueError(f"API Rate Limit: {data['Note']}")
-            
-            if "Information" in data:
-                raise ValueError(f"API Information: {data['Information']}. Check your API key or rate limits.")
+            self._check_api_errors(data)
             
             time_series = data["Time Series (Daily)"]
             
-            df = pd.DataFrame.from_dict(time_series, orient='index')
-            df.index = pd.to_datetime(df.index)
-            df = df.sort_index()
-            
-            df.columns = ['open', 'high', 'low', 'close', 'volume']
-            
-            for col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+            df = self._parse_time_series(time_series)
             
             df['symbol'] = self.symbol
             df['fetch_timestamp'] = datetime.now()
             
-            return df
-            
         except requests.exceptions.RequestException as e:
             raise RuntimeError(f"Failed to fetch data from API: {str(e)}")
+        
+        if not from_cache:
+            self._cache_set(cache_key, content)
+        return df
     
-    def save_raw_data(self, df: pd.DataFrame, output_path: str) -> str:
+    @staticmethod
+    def _write_csv(df: pd.DataFrame, filepath: str, batch_size: int = 65536) -> None:
+        """
+        Write a DataFrame to CSV through Arrow's batched writer
+        
+        Rows are formatted and flushed one batch at a time instead of pandas
+        rendering the whole file in memory first. The index is written as the
+        leading column(s), like DataFrame.to_csv, so readers can keep using
+        index_col=0.
+        
+        Args:
+            df: DataFrame to write
+            filepath: Destination CSV path
+            batch_size: Number of rows formatted per batch
+        """
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        
+        # Arrow appends index columns last; move them to the front
+        n_index = df.index.nlevels
+        names = table.column_names
+        table = table.select(names[-n_index:] + names[:-n_index])
+        table = table.rename_columns(
+            [name if name is not None else "" for name in df.index.names] + names[:-n_index]
+        )
+        
+        pacsv.write_csv(table, filepath, write_options=pacsv.WriteOptions(batch_size=batch_size))
+    
+    def save_raw_data(self, df: pd.DataFrame, output_path: str, format: str = "parquet") -> str:
         """
         Save raw data with timestamp
         
         Args:
             df: DataFrame to save
             output_path: Directory to save the data
+            format: 'parquet' (snappy-compressed, typed) or 'csv' for legacy consumers
         
         Returns:
             Path to saved file
         """
+        if format not in ("parquet", "csv"):
+            raise ValueError(f"Unsupported format: {format}. Use 'parquet' or 'csv'.")
+        
         os.makedirs(output_path, exist_ok=True)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"raw_stock_data_{self.symbol}_{timestamp}.csv"
+        filename = f"raw_stock_data_{self.symbol}_{timestamp}.{format}"
         filepath = os.path.join(output_path, filename)
         
-        df.to_csv(filepath, index=True)
+        if format == "parquet":
+            df.to_parquet(filepath, engine='pyarrow', compression='snappy', index=True)
+        else:
+            self._write_csv(df, filepath)
         print(f"Raw data saved to: {filepath}")
         
         # Also save metadata
@@ -179,7 +501,7 @@ class DataExtractor:
             }
         }
         
-        metadata_path = filepath.replace(".csv", "_metadata.json")
+        metadata_path = os.path.splitext(filepath)[0] + "_metadata.json"
         with open(metadata_path, 'w') as f:
             json.dump(metadata, f, indent=2)
         
@@ -189,10 +511,9 @@ class DataExtractor:
 def main():
     """Main function to test data extraction"""
     symbol = os.getenv("STOCK_SYMBOL", "AAPL")
-    extractor = DataExtractor(symbol=symbol)
-    
-    print(f"Fetching intraday data for {symbol}...")
-    df = extractor.fetch_intraday_data(interval="60min", outputsize="full")
+    with DataExtractor(symbol=symbol) as extractor:
+        print(f"Fetching intraday data for {symbol}...")
+        df = extractor.fetch_intraday_data(interval="60min", outputsize="full")
     
     print(f"Fetched {len(df)} rows of data")
     print(f"Date range: {df.index.min()} to {df.index.max()}")
@@ -5,13 +5,15 @@ Validates data quality before processing
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 
 
 class DataQualityChecker:
     """Performs comprehensive data quality checks"""
     
+    NUMERIC_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+    
     def __init__(self, null_threshold: float = 0.01, required_columns: List[str] = None):
         """
         Initialize quality checker
@@ -37,10 +39,100 @@ class DataQualityChecker:
         self.checks_passed['schema'] = True
         return True
     
-    def check_null_values(self, df: pd.DataFrame) -> bool:
+    def _scan_numeric_columns(self, df: pd.DataFrame) -> Dict:
+        """
+        Scan the OHLCV block once for the counts shared by several checks
+        
+        Args:
+            df: DataFrame to scan
+        
+        Returns:
+            Dict with per-column negative counts, the number of high < low rows,
+            the total null count across all columns and the frame's size
+        """
+        columns = [
+            col for col in self.NUMERIC_COLUMNS
+            if col in df.columns and pd.api.types.is_numeric_dtype(df[col])
+        ]
+        # Column arrays are views of the frame's blocks, so nothing is copied
+        arrays = {col: df[col].to_numpy() for col in columns}
+        
+        negatives = {col: np.count_nonzero(values < 0) for col, values in arrays.items()}
+        
+        high_lt_low = None
+        if 'high' in arrays and 'low' in arrays:
+            high_lt_low = np.count_nonzero(arrays['high'] < arrays['low'])
+        
+        return {
+            'negatives': negatives,
+            'high_lt_low': high_lt_low,
+            'null_count': self._count_nulls(df),
+            'n_rows': len(df),
+            'total_cells': df.shape[0] * df.shape[1]
+        }
+    
+    @staticmethod
+    def _null_masks(df: pd.DataFrame) -> Iterator[np.ndarray]:
+        """
+        Yield a missing-value mask for every column that can hold missing values
+        
+        Float columns are tested with np.isnan on a view of their values and plain
+        NumPy integer/bool columns cannot hold missing values at all, so only the
+        remaining (object, datetime, extension) columns go through pandas.
+        
+        Args:
+            df: DataFrame to scan
+        
+        Returns:
+            Iterator of boolean arrays, one per nullable column
+        """
+        for i, dtype in enumerate(df.dtypes):
+            if isinstance(dtype, np.dtype) and dtype.kind in 'iub':
+                continue
+            column = df.iloc[:, i]
+            if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+                yield np.isnan(column.to_numpy())
+            else:
+                yield column.isna().to_numpy()
+    
+    def _count_nulls(self, df: pd.DataFrame) -> int:
+        """
+        Count missing values column by column without a frame-sized boolean mask
+        
+        Args:
+            df: DataFrame to scan
+        
+        Returns:
+            Total number of missing cells
+        """
+        return int(sum(np.count_nonzero(mask) for mask in self._null_masks(df)))
+    
+    @staticmethod
+    def _scan_index(index: pd.Index) -> Dict:
+        """
+        Collect the index properties used by the temporal consistency check
+        
+        Args:
+            index: Index to scan
+        
+        Returns:
+            Dict with whether the index is datetime, its duplicate count and
+            whether it is sorted
+        """
+        is_datetime = isinstance(index, pd.DatetimeIndex)
+        return {
+            'is_datetime': is_datetime,
+            'duplicates': int(index.duplicated().sum()) if is_datetime else 0,
+            'is_sorted': index.is_monotonic_increasing if is_datetime else False
+        }
+    
+    def check_null_values(self, df: pd.DataFrame, stats: Optional[Dict] = None) -> bool:
         """Check if null values exceed threshold"""
-        total_cells = df.shape[0] * df.shape[1]
-        null_count = df.isnull().sum().sum()
+        if stats is None:
+            stats = self._scan_numeric_columns(df)
+        
+        total_cells = stats['total_cells']
+        null_count = stats['null_count']
         null_percentage = (null_count / total_cells) * 100
         
         if null_percentage > self.null_threshold * 100:
@@ -55,9 +147,7 @@ class DataQualityChecker:
     
     def check_data_types(self, df: pd.DataFrame) -> bool:
         """Check if numeric columns contain valid numbers"""
-        numeric_columns = ['open', 'high', 'low', 'close', 'volume']
-        
-        for col in numeric_columns:
+        for col in self.NUMERIC_COLUMNS:
             if col in df.columns:
                 if not pd.api.types.is_numeric_dtype(df[col]):
                     self.issues.append(f"Column '{col}' is not numeric type")
@@ -67,52 +157,55 @@ class DataQualityChecker:
         self.checks_passed['data_types'] = True
         return True
     
-    def check_value_ranges(self, df: pd.DataFrame) -> bool:
+    def check_value_ranges(self, df: pd.DataFrame, stats: Optional[Dict] = None) -> bool:
         """Check if values are within reasonable ranges"""
+        if stats is None:
+            stats = self._scan_numeric_columns(df)
+        
         issues_found = False
+        negatives = stats['negatives']
         
         # Check for negative prices
-        price_columns = ['open', 'high', 'low', 'close']
-        for col in price_columns:
-            if col in df.columns:
-                negative_count = (df[col] < 0).sum()
-                if negative_count > 0:
-                    self.issues.append(f"Found {negative_count} negative values in '{col}'")
-                    issues_found = True
+        for col in ['open', 'high', 'low', 'close']:
+            negative_count = negatives.get(col, 0)
+            if negative_count > 0:
+                self.issues.append(f"Found {negative_count} negative values in '{col}'")
+                issues_found = True
         
         # Check for negative volume
-        if 'volume' in df.columns:
-            negative_volume = (df['volume'] < 0).sum()
-            if negative_volume > 0:
-                self.issues.append(f"Found {negative_volume} negative volume values")
-                issues_found = True
+        negative_volume = negatives.get('volume', 0)
+        if negative_volume > 0:
+            self.issues.append(f"Found {negative_volume} negative volume values")
+            issues_found = True
         
         # Check high >= low
-        if 'high' in df.columns and 'low' in df.columns:
-            invalid_ranges = (df['high'] < df['low']).sum()
-            if invalid_ranges > 0:
-                self.issues.append(f"Found {invalid_ranges} rows where high < low")
-                issues_found = True
+        invalid_ranges = stats['high_lt_low']
+        if invalid_ranges:
+            self.issues.append(f"Found {invalid_ranges} rows where high < low")
+            issues_found = True
         
         self.checks_passed['value_ranges'] = not issues_found
         return not issues_found
     
-    def check_temporal_consistency(self, df: pd.DataFrame) -> bool:
+    def check_temporal_consistency(self, df: pd.DataFrame, stats: Optional[Dict] = None) -> bool:
         """Check for temporal issues in the data"""
-        if not isinstance(df.index, pd.DatetimeIndex):
+        if stats is None:
+            stats = self._scan_index(df.index)
+        
+        if not stats['is_datetime']:
             self.issues.append("Index is not a DatetimeIndex")
             self.checks_passed['temporal'] = False
             return False
         
         # Check for duplicate timestamps
-        duplicates = df.index.duplicated().sum()
+        duplicates = stats['duplicates']
         if duplicates > 0:
             self.issues.append(f"Found {duplicates} duplicate timestamps")
             self.checks_passed['temporal'] = False
             return False
         
         # Check if data is sorted
-        if not df.index.is_monotonic_increasing:
+        if not stats['is_sorted']:
             self.issues.append("Data is not sorted chronologically")
             self.checks_passed['temporal'] = False
             return False
@@ -120,10 +213,11 @@ class DataQualityChecker:
         self.checks_passed['temporal'] = True
         return True
     
-    def check_sufficient_data(self, df: pd.DataFrame, min_rows: int = 100) -> bool:
+    def check_sufficient_data(self, df: pd.DataFrame, min_rows: int = 100, stats: Optional[Dict] = None) -> bool:
         """Check if there's sufficient data for analysis"""
-        if len(df) < min_rows:
-            self.issues.append(f"Insufficient data: {len(df)} rows (minimum: {min_rows})")
+        n_rows = stats['n_rows'] if stats is not None else len(df)
+        if n_rows < min_rows:
+            self.issues.append(f"Insufficient data: {n_rows} rows (minimum: {min_rows})")
             self.checks_passed['sufficient_data'] = False
             return False
         
@@ -144,11 +238,14 @@ class DataQualityChecker:
         self.checks_passed = {}
         self.issues = []
         
+        # Scan the numeric columns once and share the counts between checks
+        stats = self._scan_numeric_columns(df)
+        
         # Run all checks
         self.check_schema(df)
-        self.check_null_values(df)
+        self.check_null_values(df, stats)
         self.check_data_types(df)
-        self.check_value_ranges(df)
+        self.check_value_ranges(df, stats)
         self.check_temporal_consistency(df)
         self.check_sufficient_data(df, min_rows)
         
@@ -157,9 +254,115 @@ class DataQualityChecker:
         
         return all_passed, self.checks_passed, self.issues
     
-    def generate_report(self, df: pd.DataFrame) -> str:
-        """Generate a detailed quality report"""
-        all_passed, checks, issues = self.run_all_checks(df)
+    def run_all_checks_multi(self, df_long: pd.DataFrame, min_rows: int = 100) -> Dict[str, Tuple[bool, Dict, List[str]]]:
+        """
+        Run all quality checks for every symbol of a long-format DataFrame
+        
+        Per-symbol counts come from one grouped reduction per column over the
+        combined frame instead of re-running every check on each symbol's slice.
+        
+        Args:
+            df_long: DataFrame indexed by (symbol, timestamp)
+            min_rows: Minimum number of rows required per symbol
+        
+        Returns:
+            Mapping of symbol -> (all_passed, checks_dict, issues_list), matching
+            run_all_checks on that symbol's rows
+        """
+        codes, symbols = pd.factorize(df_long.index.get_level_values(0))
+        n_symbols = len(symbols)
+        
+        def per_symbol(mask: np.ndarray) -> np.ndarray:
+            return np.bincount(codes[mask], minlength=n_symbols)
+        
+        # Schema and dtypes are properties of the columns, shared by all symbols
+        self.checks_passed = {}
+        self.issues = []
+        schema_passed = self.check_schema(df_long)
+        schema_issues = self.issues
+        self.issues = []
+        types_passed = self.check_data_types(df_long)
+        type_issues = self.issues
+        
+        # Per-symbol row, null, negative and high < low counts
+        n_rows = np.bincount(codes, minlength=n_symbols)
+        null_counts = np.zeros(n_symbols, dtype=np.int64)
+        for mask in self._null_masks(df_long):
+            null_counts += per_symbol(mask)
+        
+        columns = [
+            col for col in self.NUMERIC_COLUMNS
+            if col in df_long.columns and pd.api.types.is_numeric_dtype(df_long[col])
+        ]
+        arrays = {col: df_long[col].to_numpy() for col in columns}
+        negatives = {col: per_symbol(values < 0) for col, values in arrays.items()}
+        high_lt_low = None
+        if 'high' in arrays and 'low' in arrays:
+            high_lt_low = per_symbol(arrays['high'] < arrays['low'])
+        
+        # Temporal consistency of each symbol's timestamps, in row order
+        timestamps = df_long.index.get_level_values(1)
+        is_datetime = isinstance(timestamps, pd.DatetimeIndex)
+        duplicates = np.zeros(n_symbols, dtype=np.int64)
+        unsorted = np.zeros(n_symbols, dtype=np.int64)
+        if is_datetime:
+            duplicates = per_symbol(df_long.index.duplicated())
+            
+            order = np.argsort(codes, kind='stable')
+            group = codes[order]
+            values = timestamps.asi8[order]
+            # NaT never counts as sorted, matching Index.is_monotonic_increasing
+            backwards = timestamps.isna()[order]
+            backwards[1:] |= (group[1:] == group[:-1]) & (values[1:] < values[:-1])
+            unsorted = np.bincount(group[backwards], minlength=n_symbols)
+        
+        results = {}
+        for i, symbol in enumerate(symbols):
+            stats = {
+                'negatives': {col: counts[i] for col, counts in negatives.items()},
+                'high_lt_low': high_lt_low[i] if high_lt_low is not None else None,
+                'null_count': int(null_counts[i]),
+                'n_rows': int(n_rows[i]),
+                'total_cells': int(n_rows[i]) * df_long.shape[1]
+            }
+            index_stats = {
+                'is_datetime': is_datetime,
+                'duplicates': int(duplicates[i]),
+                'is_sorted': unsorted[i] == 0
+            }
+            
+            self.checks_passed = {'schema': schema_passed}
+            self.issues = list(schema_issues)
+            self.check_null_values(None, stats)
+            self.checks_passed['data_types'] = types_passed
+            self.issues.extend(type_issues)
+            self.check_value_ranges(None, stats)
+            self.check_temporal_consistency(None, index_stats)
+            self.check_sufficient_data(None, min_rows, stats)
+            
+            results[symbol] = (all(self.checks_passed.values()), self.checks_passed, self.issues)
+        
+        return results
+    
+    def generate_report(
+        self,
+        df: pd.DataFrame,
+        results: Optional[Tuple[bool, Dict, List[str]]] = None
+    ) -> str:
+        """
+        Generate a detailed quality report
+        
+        Args:
+            df: DataFrame the report describes
+            results: Output of a previous run_all_checks(df) call; checks are
+                run again only when this is omitted
+        
+        Returns:
+            Formatted report text
+        """
+        if results is None:
+            results = self.run_all_checks(df)
+        all_passed, checks, issues = results
         
         report = f"""
 DATA QUALITY REPORT
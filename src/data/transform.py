@@ -5,10 +5,20 @@ Creates time-series features for stock price prediction
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional
+from scipy.signal import lfilter
+from collections import ChainMap
+from typing import Dict, List, Mapping, Optional
 from datetime import datetime
 import os
 
+# Cyclical encodings only ever take 24 (hour) or 7 (day of week) distinct values
+_HOURS = np.arange(24)
+_HOUR_SIN = np.sin(2 * np.pi * _HOURS / 24)
+_HOUR_COS = np.cos(2 * np.pi * _HOURS / 24)
+_DAYS = np.arange(7)
+_DOW_SIN = np.sin(2 * np.pi * _DAYS / 7)
+_DOW_COS = np.cos(2 * np.pi * _DAYS / 7)
+
 
 class StockDataTransformer:
     """Transform stock data and engineer features for volatility prediction"""
@@ -23,119 +33,196 @@ class StockDataTransformer:
         self.target_column = target_column
         self.feature_names = []
     
-    def calculate_returns(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Calculate returns and log returns"""
-        df = df.copy()
-        
-        # Simple returns
-        df['returns'] = df[self.target_column].pct_change()
+    @staticmethod
+    def _price_ratio(prices: np.ndarray) -> np.ndarray:
+        """
+        Compute prices[t] / prices[t-1] with NaN in the first position
         
-        # Log returns
-        df['log_returns'] = np.log(df[self.target_column] / df[self.target_column].shift(1))
+        Args:
+            prices: Price series as a float array
         
-        self.feature_names.extend(['returns', 'log_returns'])
-        return df
+        Returns:
+            Array of one-period price ratios
+        """
+        ratio = np.empty_like(prices)
+        ratio[:1] = np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(prices[1:], prices[:-1], out=ratio[1:])
+        return ratio
     
-    def calculate_volatility(self, df: pd.DataFrame, windows: List[int] = [3, 5, 10]) -> pd.DataFrame:
+    @staticmethod
+    def _shift(values: np.ndarray, lag: int) -> np.ndarray:
         """
-        Calculate rolling volatility (standard deviation of returns)
+        Shift an array by `lag` periods, padding the vacated end with NaN
         
         Args:
-            windows: List of window sizes for rolling calculations (reduced for daily data)
+            values: Numeric column values
+            lag: Number of periods to shift by; negative values shift backwards
+        
+        Returns:
+            Shifted float array, matching Series.shift(lag)
         """
-        df = df.copy()
+        dtype = values.dtype if values.dtype.kind == 'f' else np.float64
+        n = len(values)
+        shifted = np.empty(n, dtype=dtype)
+        if lag >= 0:
+            shifted[:lag] = np.nan
+            shifted[lag:] = values[:n - lag]
+        else:
+            shifted[lag:] = np.nan
+            shifted[:lag] = values[-lag:]
+        return shifted
+    
+    @staticmethod
+    def _ema(values: np.ndarray, span: int) -> np.ndarray:
+        """
+        Exponential moving average, equivalent to ewm(span=span, adjust=False).mean()
         
-        if 'returns' not in df.columns:
-            df = self.calculate_returns(df)
+        Runs the recurrence y[t] = alpha * x[t] + (1 - alpha) * y[t-1] as a
+        single first-order IIR filter over the raw array.
         
-        for window in windows:
-            col_name = f'volatility_{window}'
-            df[col_name] = df['returns'].rolling(window=window).std()
-            self.feature_names.append(col_name)
+        Args:
+            values: Float array to smooth
+            span: EWM span; alpha = 2 / (span + 1)
         
-        return df
+        Returns:
+            Smoothed float array
+        """
+        if len(values) == 0 or np.isnan(values).any():
+            # pandas skips missing values inside the recurrence; keep its semantics
+            return pd.Series(values).ewm(span=span, adjust=False).mean().to_numpy()
+        
+        alpha = 2.0 / (span + 1)
+        smoothed, _ = lfilter([alpha], [1.0, alpha - 1.0], values, zi=[(1.0 - alpha) * values[0]])
+        return smoothed
     
-    def create_lag_features(self, df: pd.DataFrame, columns: List[str], lags: List[int] = [1, 2, 3]) -> pd.DataFrame:
+    @staticmethod
+    def _series(source: Mapping, name: str, index: pd.Index) -> pd.Series:
         """
-        Create lagged features
+        Read a column from a feature source as a Series on the frame's index
         
         Args:
-            columns: Columns to create lags for
-            lags: Number of periods to lag (reduced for daily data)
+            source: Input DataFrame, or features computed so far layered over it
+            name: Column to read
+            index: Index of the frame being transformed
+        
+        Returns:
+            Column values as a Series
         """
+        values = source[name]
+        if isinstance(values, pd.Series):
+            return values
+        return pd.Series(values, index=index, name=name)
+    
+    @staticmethod
+    def _with_features(df: pd.DataFrame, features: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """Return a copy of df with the computed feature columns added"""
         df = df.copy()
+        for name, values in features.items():
+            df[name] = values
+        return df
+    
+    def _return_features(self, source: Mapping, index: pd.Index) -> Dict[str, np.ndarray]:
+        """Compute returns and log returns"""
+        close = self._series(source, self.target_column, index)
+        
+        # One price ratio array feeds both return columns
+        ratio = self._price_ratio(close.to_numpy(dtype=np.float64))
+        
+        # Simple returns (pct_change forward-fills gaps before dividing)
+        if close.hasnans:
+            returns = self._price_ratio(close.ffill().to_numpy(dtype=np.float64)) - 1.0
+        else:
+            returns = ratio - 1.0
+        
+        # Log returns
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_returns = np.log(ratio)
+        
+        self.feature_names.extend(['returns', 'log_returns'])
+        return {'returns': returns, 'log_returns': log_returns}
+    
+    def _volatility_features(self, source: Mapping, index: pd.Index, windows: List[int]) -> Dict[str, np.ndarray]:
+        """Compute rolling volatility of returns for each window"""
+        returns = self._series(source, 'returns', index)
+        features = {}
+        
+        for window in windows:
+            features[f'volatility_{window}'] = returns.rolling(window=window).std().to_numpy()
+        
+        self.feature_names.extend(features)
+        return features
+    
+    def _lag_features(self, source: Mapping, index: pd.Index, columns: List[str], lags: List[int]) -> Dict[str, np.ndarray]:
+        """Compute lagged copies of the given columns"""
+        features = {}
         
         for col in columns:
-            if col in df.columns:
+            if col in source:
+                values = np.asarray(source[col])
                 for lag in lags:
-                    lag_col_name = f'{col}_lag_{lag}'
-                    df[lag_col_name] = df[col].shift(lag)
-                    self.feature_names.append(lag_col_name)
+                    features[f'{col}_lag_{lag}'] = self._shift(values, lag)
         
-        return df
+        self.feature_names.extend(features)
+        return features
     
-    def create_rolling_features(self, df: pd.DataFrame, windows: List[int] = [3, 5, 10]) -> pd.DataFrame:
-        """
-        Create rolling statistical features
-        
-        Args:
-            windows: Window sizes for rolling calculations (reduced for daily data)
-        """
-        df = df.copy()
+    def _rolling_features(self, source: Mapping, index: pd.Index, windows: List[int]) -> Dict[str, np.ndarray]:
+        """Compute rolling statistics and Bollinger bands of the target column"""
+        close = self._series(source, self.target_column, index)
+        features = {}
         
         for window in windows:
-            # Rolling mean
-            df[f'close_ma_{window}'] = df[self.target_column].rolling(window=window).mean()
+            rolling = close.rolling(window=window)
             
-            # Rolling std
-            df[f'close_std_{window}'] = df[self.target_column].rolling(window=window).std()
+            # Rolling mean and std, reused for the Bollinger bands
+            ma = rolling.mean().to_numpy()
+            std = rolling.std().to_numpy()
+            features[f'close_ma_{window}'] = ma
+            features[f'close_std_{window}'] = std
             
             # Rolling min/max
-            df[f'close_min_{window}'] = df[self.target_column].rolling(window=window).min()
-            df[f'close_max_{window}'] = df[self.target_column].rolling(window=window).max()
+            features[f'close_min_{window}'] = rolling.min().to_numpy()
+            features[f'close_max_{window}'] = rolling.max().to_numpy()
             
             # Bollinger bands
-            df[f'bb_upper_{window}'] = df[f'close_ma_{window}'] + (2 * df[f'close_std_{window}'])
-            df[f'bb_lower_{window}'] = df[f'close_ma_{window}'] - (2 * df[f'close_std_{window}'])
-            
-            self.feature_names.extend([
-                f'close_ma_{window}',
-                f'close_std_{window}',
-                f'close_min_{window}',
-                f'close_max_{window}',
-                f'bb_upper_{window}',
-                f'bb_lower_{window}'
-            ])
+            band = 2 * std
+            features[f'bb_upper_{window}'] = ma + band
+            features[f'bb_lower_{window}'] = ma - band
         
-        return df
+        self.feature_names.extend(features)
+        return features
     
-    def create_technical_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Create common technical indicators"""
-        df = df.copy()
+    def _technical_features(self, source: Mapping, index: pd.Index) -> Dict[str, np.ndarray]:
+        """Compute RSI, MACD, momentum and volume indicators"""
+        close_series = self._series(source, self.target_column, index)
+        features = {}
         
         # RSI (Relative Strength Index) - reduced window for daily data
-        delta = df[self.target_column].diff()
+        delta = close_series.diff()
         gain = (delta.where(delta > 0, 0)).rolling(window=7).mean()
         loss = (-delta.where(delta < 0, 0)).rolling(window=7).mean()
         rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
+        features['rsi'] = (100 - (100 / (1 + rs))).to_numpy()
         
         # MACD (Moving Average Convergence Divergence)
-        exp1 = df[self.target_column].ewm(span=12, adjust=False).mean()
-        exp2 = df[self.target_column].ewm(span=26, adjust=False).mean()
-        df['macd'] = exp1 - exp2
-        df['macd_signal'] = df['macd'].ewm(span=9, adjust=False).mean()
-        df['macd_diff'] = df['macd'] - df['macd_signal']
+        close = close_series.to_numpy(dtype=np.float64)
+        macd = self._ema(close, span=12) - self._ema(close, span=26)
+        macd_signal = self._ema(macd, span=9)
+        features['macd'] = macd
+        features['macd_signal'] = macd_signal
+        features['macd_diff'] = macd - macd_signal
         
         # Price momentum (reduced windows for daily data)
-        df['momentum_3'] = df[self.target_column] - df[self.target_column].shift(3)
-        df['momentum_5'] = df[self.target_column] - df[self.target_column].shift(5)
+        features['momentum_3'] = (close_series - close_series.shift(3)).to_numpy()
+        features['momentum_5'] = (close_series - close_series.shift(5)).to_numpy()
         
         # Volume indicators
-        if 'volume' in df.columns:
-            df['volume_ma_5'] = df['volume'].rolling(window=5).mean()
-            df['volume_ma_10'] = df['volume'].rolling(window=10).mean()
-            df['volume_ratio'] = df['volume'] / df['volume_ma_10']
+        if 'volume' in source:
+            volume = self._series(source, 'volume', index)
+            volume_ma_10 = volume.rolling(window=10).mean()
+            features['volume_ma_5'] = volume.rolling(window=5).mean().to_numpy()
+            features['volume_ma_10'] = volume_ma_10.to_numpy()
+            features['volume_ratio'] = (volume / volume_ma_10).to_numpy()
             
             self.feature_names.extend(['volume_ma_5', 'volume_ma_10', 'volume_ratio'])
         
@@ -144,74 +231,146 @@ class StockDataTransformer:
             'momentum_3', 'momentum_5'
         ])
         
-        return df
+        return features
     
-    def create_time_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Create time-based features"""
-        df = df.copy()
+    def _time_features(self, index: pd.DatetimeIndex) -> Dict[str, np.ndarray]:
+        """Compute calendar features from the index"""
+        features = {}
         
         # Check if we have intraday data (has hour information)
-        has_hour = hasattr(df.index, 'hour') and (df.index.hour != 0).any()
+        has_hour = hasattr(index, 'hour') and (index.hour != 0).any()
         
         if has_hour:
             # Intraday data - include hour features
-            df['hour'] = df.index.hour
-            df['hour_sin'] = np.sin(2 * np.pi * df['hour'] / 24)
-            df['hour_cos'] = np.cos(2 * np.pi * df['hour'] / 24)
-            self.feature_names.extend(['hour', 'hour_sin', 'hour_cos'])
+            hours = index.hour.to_numpy()
+            features['hour'] = hours
+            features['hour_sin'] = _HOUR_SIN[hours]
+            features['hour_cos'] = _HOUR_COS[hours]
         else:
             # Daily data - set hour features to default values
-            df['hour'] = 0
-            df['hour_sin'] = 0.0
-            df['hour_cos'] = 1.0
-            self.feature_names.extend(['hour', 'hour_sin', 'hour_cos'])
+            features['hour'] = np.zeros(len(index), dtype=np.int64)
+            features['hour_sin'] = np.zeros(len(index))
+            features['hour_cos'] = np.ones(len(index))
+        self.feature_names.extend(['hour', 'hour_sin', 'hour_cos'])
         
         # These work for both intraday and daily data
-        df['day_of_week'] = df.index.dayofweek
-        df['day_of_month'] = df.index.day
-        df['month'] = df.index.month
-        df['quarter'] = df.index.quarter
+        day_of_week = index.dayofweek.to_numpy()
+        features['day_of_week'] = day_of_week
+        features['day_of_month'] = index.day.to_numpy()
+        features['month'] = index.month.to_numpy()
+        features['quarter'] = index.quarter.to_numpy()
         
         # Cyclical encoding for day of week
-        df['day_sin'] = np.sin(2 * np.pi * df['day_of_week'] / 7)
-        df['day_cos'] = np.cos(2 * np.pi * df['day_of_week'] / 7)
+        features['day_sin'] = _DOW_SIN[day_of_week]
+        features['day_cos'] = _DOW_COS[day_of_week]
         
         self.feature_names.extend([
             'day_of_week', 'day_of_month', 'month', 'quarter',
             'day_sin', 'day_cos'
         ])
         
-        return df
+        return features
     
-    def create_target_variable(self, df: pd.DataFrame, horizon: int = 1) -> pd.DataFrame:
+    def _target_features(self, source: Mapping, index: pd.Index, horizon: int,
+                         realized_vol: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
         """
-        Create target variable: future volatility
+        Compute future volatility targets
         
         Args:
             horizon: Number of periods ahead to predict
+            realized_vol: Rolling std of returns over `horizon` periods, when
+                already computed as a volatility feature
         """
-        df = df.copy()
+        returns = np.asarray(source['returns'], dtype=np.float64)
         
         # Calculate future returns
-        df['future_returns'] = df['returns'].shift(-horizon)
+        future_returns = self._shift(returns, -horizon)
         
         # Target: absolute value of future returns (volatility proxy)
-        df['target_volatility'] = df['future_returns'].abs()
+        target_volatility = np.abs(future_returns)
         
         # Alternative target: use rolling std of returns as realized volatility
         # Use forward-looking window (next N days volatility)
         if horizon > 1:
-            df['target_realized_vol'] = df['returns'].shift(-horizon).rolling(window=horizon).std()
+            if realized_vol is not None:
+                # std(returns[t+1 .. t+horizon]) is volatility_{horizon} at t+horizon;
+                # the forward window is undefined for the first horizon-1 rows
+                target_realized_vol = self._shift(realized_vol, -horizon)
+                target_realized_vol[:horizon - 1] = np.nan
+            else:
+                target_realized_vol = (
+                    pd.Series(future_returns, index=index).rolling(window=horizon).std().to_numpy()
+                )
         else:
             # For horizon=1, use same as target_volatility
-            df['target_realized_vol'] = df['target_volatility']
+            target_realized_vol = target_volatility
         
-        return df
+        return {
+            'future_returns': future_returns,
+            'target_volatility': target_volatility,
+            'target_realized_vol': target_realized_vol
+        }
+    
+    def calculate_returns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Calculate returns and log returns"""
+        return self._with_features(df, self._return_features(df, df.index))
+    
+    def calculate_volatility(self, df: pd.DataFrame, windows: List[int] = [3, 5, 10]) -> pd.DataFrame:
+        """
+        Calculate rolling volatility (standard deviation of returns)
+        
+        Args:
+            windows: List of window sizes for rolling calculations (reduced for daily data)
+        """
+        if 'returns' not in df.columns:
+            df = self.calculate_returns(df)
+        
+        return self._with_features(df, self._volatility_features(df, df.index, windows))
+    
+    def create_lag_features(self, df: pd.DataFrame, columns: List[str], lags: List[int] = [1, 2, 3]) -> pd.DataFrame:
+        """
+        Create lagged features
+        
+        Args:
+            columns: Columns to create lags for
+            lags: Number of periods to lag (reduced for daily data)
+        """
+        return self._with_features(df, self._lag_features(df, df.index, columns, lags))
+    
+    def create_rolling_features(self, df: pd.DataFrame, windows: List[int] = [3, 5, 10]) -> pd.DataFrame:
+        """
+        Create rolling statistical features
+        
+        Args:
+            windows: Window sizes for rolling calculations (reduced for daily data)
+        """
+        return self._with_features(df, self._rolling_features(df, df.index, windows))
+    
+    def create_technical_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Create common technical indicators"""
+        return self._with_features(df, self._technical_features(df, df.index))
+    
+    def create_time_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Create time-based features"""
+        return self._with_features(df, self._time_features(df.index))
+    
+    def create_target_variable(self, df: pd.DataFrame, horizon: int = 1) -> pd.DataFrame:
+        """
+        Create target variable: future volatility
+        
+        Args:
+            horizon: Number of periods ahead to predict
+        """
+        return self._with_features(df, self._target_features(df, df.index, horizon))
     
     def transform(self, df: pd.DataFrame, horizon: int = 1) -> pd.DataFrame:
         """
         Apply all transformations
         
+        Each step reads the input columns and the features computed before it,
+        and returns plain arrays; the frame is assembled once at the end instead
+        of being copied and grown column by column at every step.
+        
         Args:
             df: Input DataFrame with OHLCV data
             horizon: Prediction horizon
@@ -220,40 +379,70 @@ class StockDataTransformer:
             Transformed DataFrame with all features
         """
         self.feature_names = []
+        index = df.index
+        features = {}
+        # Later steps see earlier features first, then the input columns
+        source = ChainMap(features, df)
         
         print("Starting data transformation...")
         
         # Calculate returns
-        df = self.calculate_returns(df)
+        features.update(self._return_features(source, index))
         print(f"  ✓ Calculated returns")
         
         # Calculate volatility
-        df = self.calculate_volatility(df)
+        features.update(self._volatility_features(source, index, windows=[3, 5, 10]))
         print(f"  ✓ Calculated volatility measures")
         
         # Create lag features
-        df = self.create_lag_features(df, columns=['close', 'returns', 'volume'])
+        features.update(self._lag_features(source, index, columns=['close', 'returns', 'volume'], lags=[1, 2, 3]))
         print(f"  ✓ Created lag features")
         
         # Create rolling features
-        df = self.create_rolling_features(df)
+        features.update(self._rolling_features(source, index, windows=[3, 5, 10]))
         print(f"  ✓ Created rolling features")
         
         # Create technical indicators
-        df = self.create_technical_indicators(df)
+        features.update(self._technical_features(source, index))
         print(f"  ✓ Created technical indicators")
         
         # Create time features
-        df = self.create_time_features(df)
+        features.update(self._time_features(index))
         print(f"  ✓ Created time features")
         
-        # Create target variable
-        df = self.create_target_variable(df, horizon=horizon)
+        # Create target variable, reusing the matching volatility window if any
+        features.update(self._target_features(
+            source, index, horizon=horizon, realized_vol=features.get(f'volatility_{horizon}')
+        ))
         print(f"  ✓ Created target variable")
         
-        # Drop rows with NaN values (due to rolling windows and lags)
+        # Overwrite any input columns in place; the rest are attached below
+        existing = [name for name in features if name in df.columns]
+        if existing:
+            df = self._with_features(df, {name: features.pop(name) for name in existing})
+        
+        # Drop rows with NaN values (due to rolling windows and lags). The mask is
+        # built from the feature arrays directly, so the full frame is only ever
+        # assembled from the surviving rows.
         initial_rows = len(df)
-        df = df.dropna()
+        keep = df.notna().all(axis=1).to_numpy()
+        for values in features.values():
+            if values.dtype.kind == 'f':
+                keep &= ~np.isnan(values)
+        
+        # Usually only the warm-up and horizon rows are dropped, leaving one
+        # contiguous block that can be sliced without copying
+        kept = np.flatnonzero(keep)
+        if len(kept) and kept[-1] - kept[0] + 1 == len(kept):
+            rows = slice(kept[0], kept[-1] + 1)
+        else:
+            rows = keep
+        
+        # Materialize the result once: the surviving input columns and the
+        # features go into a single frame, with no intermediate concat copy
+        columns = {name: df[name].array[rows] for name in df.columns}
+        columns.update((name, values[rows]) for name, values in features.items())
+        df = pd.DataFrame(columns, index=df.index[rows])
         print(f"  ✓ Dropped {initial_rows - len(df)} rows with missing values")
         
         print(f"\nTransformation complete! Final shape: {df.shape}")
@@ -266,10 +455,10 @@ class StockDataTransformer:
         os.makedirs(output_path, exist_ok=True)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"processed_stock_data_{symbol}_{timestamp}.csv"
+        filename = f"processed_stock_data_{symbol}_{timestamp}.parquet"
         filepath = os.path.join(output_path, filename)
         
-        df.to_csv(filepath, index=True)
+        df.to_parquet(filepath, engine='pyarrow', compression='zstd', index=True)
         print(f"Processed data saved to: {filepath}")
         
         return filepath
@@ -4,27 +4,80 @@ Train models to predict stock volatility
 """
 
 import os
+import tempfile
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, TimeSeriesSplit
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.linear_model import Ridge, Lasso
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-import mlflow
-import mlflow.sklearn
 from datetime import datetime
-import joblib
 from typing import Dict, Tuple, Optional
 from dotenv import load_dotenv
 import json
 
+# mlflow, sklearn, joblib and the optional model backends are imported in
+# the methods that use them, so importing this module (or loading data with
+# prepare_features) does not pay for them
+
+try:
+    import lz4  # noqa: F401 - enables joblib's lz4 compressor
+    ARTIFACT_COMPRESSION = ("lz4", 3)
+except ImportError:  # pragma: no cover - fall back to joblib's built-in zlib
+    ARTIFACT_COMPRESSION = ("zlib", 3)
+
 load_dotenv()
 
+# Models refit on the random forest's most important features in main()
+PREFILTERED_MODELS = ("gradient_boosting", "ridge")
+
+# Number of features kept for the prefiltered models
+N_SELECTED_FEATURES = 32
+
 
 class VolatilityPredictor:
     """Train and evaluate volatility prediction models"""
     
+    # Default hyperparameters per model type
+    DEFAULT_PARAMS = {
+        "random_forest": {
+            "n_estimators": 100,
+            "max_depth": 10,
+            "min_samples_split": 5,
+            "min_samples_leaf": 2,
+            "random_state": 42,
+            "n_jobs": -1
+        },
+        "gradient_boosting": {
+            "n_estimators": 100,
+            "learning_rate": 0.1,
+            "max_depth": 5,
+            "random_state": 42
+        },
+        "hist_gb": {
+            "max_iter": 200,
+            "max_depth": 8,
+            "learning_rate": 0.05,
+            "early_stopping": True,
+            "random_state": 42
+        },
+        "ridge": {
+            "alpha": 1.0,
+            "random_state": 42
+        },
+        "lasso": {
+            "alpha": 0.1,
+            "random_state": 42
+        }
+    }
+    
+    # Extra LightGBM settings for gradient boosting, applied under the
+    # shared defaults (which LGBMRegressor also accepts)
+    LIGHTGBM_PARAMS = {
+        "num_leaves": 63,
+        "colsample_bytree": 0.8,
+        "subsample": 0.8,
+        "subsample_freq": 1,
+        "n_jobs": -1,
+        "verbose": -1
+    }
+    
     def __init__(self, experiment_name: str = "stock_volatility_prediction"):
         """
         Initialize the predictor
@@ -33,15 +86,20 @@ class VolatilityPredictor:
             experiment_name: Name for MLflow experiment
         """
         self.experiment_name = experiment_name
-        self.scaler = StandardScaler()
+        self.scaler = None
         self.model = None
         self.feature_columns = None
-        
-        # Setup MLflow
-        self._setup_mlflow()
+        self.feature_stats = None
+        # float32 scaler statistics cached after each fit
+        self._mean = None
+        self._inv_scale = None
+        # MLflow is configured on the first logged run
+        self._mlflow_configured = False
     
     def _setup_mlflow(self):
         """Configure MLflow tracking"""
+        import mlflow
+        
         tracking_uri = os.getenv("MLFLOW_TRACKING_URI", "file:./mlruns")
         mlflow.set_tracking_uri(tracking_uri)
         
@@ -54,6 +112,7 @@ class VolatilityPredictor:
             print(f"Warning: Could not set MLflow experiment: {e}")
         
         mlflow.set_experiment(self.experiment_name)
+        self._mlflow_configured = True
         print(f"MLflow tracking URI: {tracking_uri}")
         print(f"Experiment: {self.experiment_name}")
     
@@ -76,8 +135,9 @@ class VolatilityPredictor:
         
         feature_cols = [col for col in df.columns if col not in exclude_cols]
         
-        X = df[feature_cols]
-        y = df[target_col]
+        # float32 halves the bytes the estimators scan per pass over X
+        X = df[feature_cols].astype(np.float32, copy=False)
+        y = df[target_col].astype(np.float32, copy=False)
         
         self.feature_columns = feature_cols
         
@@ -112,6 +172,56 @@ class VolatilityPredictor:
         
         return X_train, X_test, y_train, y_test
     
+    @staticmethod
+    def _as_matrix(X: pd.DataFrame) -> np.ndarray:
+        """
+        Convert features to a C-contiguous float32 matrix
+        
+        Views of the frame's storage are copied, so the matrix can be scaled
+        in place without modifying X.
+        
+        Args:
+            X: Features
+        
+        Returns:
+            Feature matrix owned by the caller
+        """
+        matrix = X.to_numpy(dtype=np.float32, copy=False)
+        return np.array(matrix, order='C', copy=not matrix.flags.owndata)
+    
+    @classmethod
+    def _build_model(cls, model_type: str, params: Dict) -> object:
+        """
+        Instantiate an unfitted estimator
+        
+        Args:
+            model_type: Type of model to build
+            params: Model hyperparameters
+        
+        Returns:
+            Unfitted model
+        """
+        from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, HistGradientBoostingRegressor
+        from sklearn.linear_model import Ridge, Lasso
+        
+        if model_type == "random_forest":
+            return RandomForestRegressor(**params)
+        elif model_type == "gradient_boosting":
+            # LightGBM's histogram splits and native threads, when available
+            try:
+                import lightgbm as lgb
+            except ImportError:  # pragma: no cover - fall back to sklearn
+                return GradientBoostingRegressor(**params)
+            return lgb.LGBMRegressor(**{**cls.LIGHTGBM_PARAMS, **params})
+        elif model_type == "hist_gb":
+            return HistGradientBoostingRegressor(**params)
+        elif model_type == "ridge":
+            return Ridge(**params)
+        elif model_type == "lasso":
+            return Lasso(**params)
+        else:
+            raise ValueError(f"Unknown model type: {model_type}")
+    
     def train_model(
         self,
         X_train: pd.DataFrame,
@@ -131,47 +241,29 @@ class VolatilityPredictor:
         Returns:
             Trained model
         """
-        # Default hyperparameters
-        default_params = {
-            "random_forest": {
-                "n_estimators": 100,
-                "max_depth": 10,
-                "min_samples_split": 5,
-                "min_samples_leaf": 2,
-                "random_state": 42
-            },
-            "gradient_boosting": {
-                "n_estimators": 100,
-                "learning_rate": 0.1,
-                "max_depth": 5,
-                "random_state": 42
-            },
-            "ridge": {
-                "alpha": 1.0,
-                "random_state": 42
-            },
-            "lasso": {
-                "alpha": 0.1,
-                "random_state": 42
-            }
+        # User hyperparameters override the defaults key by key, so settings
+        # such as n_jobs survive unless explicitly given
+        params = {**self.DEFAULT_PARAMS.get(model_type, {}), **(hyperparameters or {})}
+        
+        # Training feature statistics (feature column order), used for drift detection
+        self.feature_stats = {
+            'mean': X_train.mean().to_numpy(),
+            'std': X_train.std().to_numpy(),
+            'min': X_train.min().to_numpy(),
+            'max': X_train.max().to_numpy()
         }
         
-        params = hyperparameters or default_params.get(model_type, {})
-        
         # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
+        from sklearn.preprocessing import StandardScaler
+        
+        X_train_scaled = self._as_matrix(X_train)
+        self.scaler = StandardScaler().fit(X_train_scaled)
+        self._mean = self.scaler.mean_.astype(np.float32)
+        self._inv_scale = (1.0 / self.scaler.scale_).astype(np.float32)
+        X_train_scaled = self._fast_transform(X_train_scaled)
         
         # Initialize model
-        if model_type == "random_forest":
-            self.model = RandomForestRegressor(**params)
-        elif model_type == "gradient_boosting":
-            self.model = GradientBoostingRegressor(**params)
-        elif model_type == "ridge":
-            self.model = Ridge(**params)
-        elif model_type == "lasso":
-            self.model = Lasso(**params)
-        else:
-            raise ValueError(f"Unknown model type: {model_type}")
+        self.model = self._build_model(model_type, params)
         
         # Train model
         print(f"Training {model_type} model...")
@@ -180,6 +272,69 @@ class VolatilityPredictor:
         
         return self.model
     
+    @staticmethod
+    def _compute_metrics(y_true: pd.Series, y_pred: np.ndarray) -> Dict[str, float]:
+        """
+        Compute regression metrics for a set of predictions
+        
+        Args:
+            y_true: Actual target values
+            y_pred: Predicted target values
+        
+        Returns:
+            Dictionary of metrics
+        """
+        # Work on raw arrays and share one residual across the metrics;
+        # zero targets are masked out of MAPE instead of producing inf
+        yt = y_true.to_numpy(dtype=np.float64)
+        yp = y_pred.astype(np.float64, copy=False)
+        diff = yt - yp
+        
+        # Sums of squares as dot products, with no squared temporaries
+        ss_res = np.dot(diff, diff)
+        centered = yt - yt.mean()
+        ss_tot = np.dot(centered, centered)
+        
+        # The absolute residual is reused in place for the MAPE ratios, which
+        # average over the nonzero targets only (NaN if there are none)
+        abs_diff = np.abs(diff, out=diff)
+        mae = abs_diff.mean()
+        nonzero = yt != 0
+        n_nonzero = np.count_nonzero(nonzero)
+        np.divide(abs_diff, np.abs(yt, out=centered), out=abs_diff, where=nonzero)
+        abs_diff[~nonzero] = 0.0
+        mape = abs_diff.sum() / n_nonzero * 100 if n_nonzero else np.nan
+        
+        # Constant targets follow r2_score: 1.0 for a perfect fit, else 0.0
+        if ss_tot:
+            r2 = 1.0 - ss_res / ss_tot
+        else:
+            r2 = 1.0 if ss_res == 0 else 0.0
+        
+        return {
+            "rmse": np.sqrt(ss_res / len(diff)),
+            "mae": mae,
+            "r2": r2,
+            "mape": mape
+        }
+    
+    def _fast_transform(self, X: np.ndarray) -> np.ndarray:
+        """
+        Standardize a feature matrix in place with the cached scaler statistics
+        
+        Equivalent to scaler.transform, as one subtract and one multiply
+        without sklearn's input validation.
+        
+        Args:
+            X: C-contiguous float32 matrix owned by the caller (see _as_matrix)
+        
+        Returns:
+            X, standardized
+        """
+        X -= self._mean
+        X *= self._inv_scale
+        return X
+    
     def evaluate_model(self, X_test: pd.DataFrame, y_test: pd.Series) -> Dict[str, float]:
         """
         Evaluate model performance
@@ -191,15 +346,10 @@ class VolatilityPredictor:
         Returns:
             Dictionary of metrics
         """
-        X_test_scaled = self.scaler.transform(X_test)
+        X_test_scaled = self._fast_transform(self._as_matrix(X_test))
         y_pred = self.model.predict(X_test_scaled)
         
-        metrics = {
-            "rmse": np.sqrt(mean_squared_error(y_test, y_pred)),
-            "mae": mean_absolute_error(y_test, y_pred),
-            "r2": r2_score(y_test, y_pred),
-            "mape": np.mean(np.abs((y_test - y_pred) / y_test)) * 100
-        }
+        metrics = self._compute_metrics(y_test, y_pred)
         
         print(f"\nModel Evaluation:")
         print(f"  RMSE: {metrics['rmse']:.6f}")
@@ -209,43 +359,137 @@ class VolatilityPredictor:
         
         return metrics
     
+    def cross_validate(
+        self,
+        X: pd.DataFrame,
+        y: pd.Series,
+        n_splits: int = 5,
+        model_type: str = "random_forest",
+        hyperparameters: Optional[Dict] = None
+    ) -> Dict[str, float]:
+        """
+        Walk-forward cross-validation over expanding time windows
+        
+        The scaler is fitted once, on the first training window, and reused
+        for every fold. Random forests are warm-started: each fold adds
+        n_estimators / n_splits new trees fitted on the current window
+        instead of rebuilding the whole forest. Per-fold metrics are logged
+        to the active MLflow run, if any, as cv_fold_* with the fold as the
+        step.
+        
+        Args:
+            X: Features
+            y: Target
+            n_splits: Number of TimeSeriesSplit folds
+            model_type: Type of model to validate
+            hyperparameters: Model hyperparameters
+        
+        Returns:
+            Dictionary of metrics averaged over the folds
+        """
+        import mlflow
+        from sklearn.model_selection import TimeSeriesSplit
+        from sklearn.preprocessing import StandardScaler
+        
+        params = {**self.DEFAULT_PARAMS.get(model_type, {}), **(hyperparameters or {})}
+        folds = list(TimeSeriesSplit(n_splits=n_splits).split(X))
+        
+        # Later windows contain the first one, so a single fit never sees test data
+        X_scaled = self._as_matrix(X)
+        scaler = StandardScaler().fit(X_scaled[folds[0][0]])
+        X_scaled = scaler.transform(X_scaled, copy=False)
+        
+        warm_start = model_type == "random_forest"
+        if warm_start:
+            trees_per_fold = max(1, params.get("n_estimators", 100) // n_splits)
+            model = self._build_model(model_type, {**params, "n_estimators": 0, "warm_start": True})
+        
+        fold_metrics = []
+        for fold, (train_idx, test_idx) in enumerate(folds):
+            if warm_start:
+                model.n_estimators += trees_per_fold
+            else:
+                model = self._build_model(model_type, params)
+            
+            model.fit(X_scaled[train_idx], y.iloc[train_idx])
+            metrics = self._compute_metrics(y.iloc[test_idx], model.predict(X_scaled[test_idx]))
+            fold_metrics.append(metrics)
+            
+            if mlflow.active_run() is not None:
+                mlflow.log_metrics({f"cv_fold_{name}": value for name, value in metrics.items()}, step=fold)
+            
+            print(f"  Fold {fold + 1}/{n_splits}: RMSE {metrics['rmse']:.6f}, R² {metrics['r2']:.4f}")
+        
+        cv_metrics = {
+            f"cv_{name}": float(np.mean([metrics[name] for metrics in fold_metrics]))
+            for name in fold_metrics[0]
+        }
+        print(f"✓ Cross-validation complete: mean RMSE {cv_metrics['cv_rmse']:.6f}")
+        
+        return cv_metrics
+    
     def train_and_log(
         self,
-        df: pd.DataFrame,
+        df: Optional[pd.DataFrame],
         model_type: str = "random_forest",
         hyperparameters: Optional[Dict] = None,
         run_name: Optional[str] = None,
-        profile_report_path: Optional[str] = None
+        profile_report_path: Optional[str] = None,
+        prepared: Optional[Tuple] = None,
+        extra_params: Optional[Dict] = None,
+        cv_splits: Optional[int] = None
     ) -> Dict:
         """
         Complete training pipeline with MLflow logging
         
         Args:
-            df: Processed dataframe
+            df: Processed dataframe (unused when prepared is given)
             model_type: Type of model to train
             hyperparameters: Model hyperparameters
             run_name: Name for MLflow run
             profile_report_path: Path to data profiling HTML report
+            prepared: Precomputed (X_train, X_test, y_train, y_test) from
+                prepare_features and split_data, shared across runs
+            extra_params: Additional run parameters to log
+            cv_splits: Number of walk-forward folds to cross-validate on the
+                training set before the final fit, if any
         
         Returns:
-            Dictionary with metrics and model info
+            Dictionary with metrics and model info (plus feature importances
+            for tree-based models and cross-validation metrics if run)
         """
+        import joblib
+        import mlflow
+        import mlflow.sklearn
+        
+        if not self._mlflow_configured:
+            self._setup_mlflow()
+        
         with mlflow.start_run(run_name=run_name):
             # Prepare data
-            X, y = self.prepare_features(df)
-            X_train, X_test, y_train, y_test = self.split_data(X, y)
+            if prepared is None:
+                X, y = self.prepare_features(df)
+                prepared = self.split_data(X, y)
+            X_train, X_test, y_train, y_test = prepared
+            self.feature_columns = list(X_train.columns)
             
-            # Log dataset info
-            mlflow.log_param("dataset_size", len(df))
-            mlflow.log_param("train_size", len(X_train))
-            mlflow.log_param("test_size", len(X_test))
-            mlflow.log_param("n_features", len(self.feature_columns))
+            # Log dataset info, model type and hyperparameters in one request
+            mlflow.log_params({
+                "dataset_size": len(X_train) + len(X_test),
+                "train_size": len(X_train),
+                "test_size": len(X_test),
+                "n_features": len(self.feature_columns),
+                "model_type": model_type,
+                **{f"param_{key}": value for key, value in (hyperparameters or {}).items()},
+                **({"cv_splits": cv_splits} if cv_splits else {}),
+                **(extra_params or {})
+            })
             
-            # Log model type and hyperparameters
-            mlflow.log_param("model_type", model_type)
-            if hyperparameters:
-                for key, value in hyperparameters.items():
-                    mlflow.log_param(f"param_{key}", value)
+            # Cross-validate on the training set only, so the test set stays held out
+            cv_metrics = None
+            if cv_splits:
+                cv_metrics = self.cross_validate(X_train, y_train, cv_splits, model_type, hyperparameters)
+                mlflow.log_metrics(cv_metrics)
             
             # Train model
             self.train_model(X_train, y_train, model_type, hyperparameters)
@@ -254,21 +498,18 @@ class VolatilityPredictor:
             metrics = self.evaluate_model(X_test, y_test)
             
             # Log metrics
-            for metric_name, metric_value in metrics.items():
-                mlflow.log_metric(metric_name, metric_value)
+            mlflow.log_metrics(metrics)
             
             # Log feature importances for tree-based models
+            feature_importance = None
             if hasattr(self.model, 'feature_importances_'):
                 feature_importance = pd.DataFrame({
                     'feature': self.feature_columns,
                     'importance': self.model.feature_importances_
                 }).sort_values('importance', ascending=False)
                 
-                # Save and log feature importance
-                importance_path = "feature_importance.csv"
-                feature_importance.to_csv(importance_path, index=False)
-                mlflow.log_artifact(importance_path)
-                os.remove(importance_path)
+                # Log feature importance straight from memory
+                mlflow.log_text(feature_importance.to_csv(index=False), "feature_importance.csv")
                 
                 print(f"\nTop 10 Important Features:")
                 print(feature_importance.head(10))
@@ -285,45 +526,149 @@ class VolatilityPredictor:
                 registered_model_name=os.getenv("MODEL_NAME", "stock_volatility_predictor")
             )
             
-            # Log scaler
-            scaler_path = "scaler.pkl"
-            joblib.dump(self.scaler, scaler_path)
-            mlflow.log_artifact(scaler_path)
-            os.remove(scaler_path)
+            # Log compressed model and scaler pickles (binary, so they go
+            # through a private temporary directory rather than the shared
+            # working directory). Only these uploads are compressed; local
+            # copies stay uncompressed so the API can memory-map them.
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                for name, obj in (("model_compressed.pkl", self.model), ("scaler.pkl", self.scaler)):
+                    artifact_path = os.path.join(tmp_dir, name)
+                    joblib.dump(obj, artifact_path, compress=ARTIFACT_COMPRESSION, protocol=5)
+                    mlflow.log_artifact(artifact_path)
+                
+                # Log the ONNX export alongside the pickled model
+                onnx_path = self.save_onnx(tmp_dir, "model", len(self.feature_columns))
+                if onnx_path is not None:
+                    mlflow.log_artifact(onnx_path)
             
             # Log feature columns
-            with open("feature_columns.json", "w") as f:
-                json.dump(self.feature_columns, f)
-            mlflow.log_artifact("feature_columns.json")
-            os.remove("feature_columns.json")
+            mlflow.log_dict(self.feature_columns, "feature_columns.json")
             
             run_id = mlflow.active_run().info.run_id
             print(f"\n✓ MLflow run completed: {run_id}")
             
-            return {
+            result = {
                 "run_id": run_id,
                 "metrics": metrics,
                 "model_type": model_type
             }
+            if feature_importance is not None:
+                result["feature_importance"] = feature_importance
+            if cv_metrics is not None:
+                result["cv_metrics"] = cv_metrics
+            
+            return result
     
     def save_model_locally(self, output_path: str, model_name: str):
         """Save model and scaler locally"""
+        import joblib
+        
         os.makedirs(output_path, exist_ok=True)
         
-        # Save model
+        # Save model (uncompressed so the API can memory-map it)
         model_path = os.path.join(output_path, f"{model_name}.pkl")
-        joblib.dump(self.model, model_path)
+        joblib.dump(self.model, model_path, compress=0)
+        self.save_onnx(output_path, model_name, len(self.feature_columns))
         
         # Save scaler
         scaler_path = os.path.join(output_path, f"{model_name}_scaler.pkl")
-        joblib.dump(self.scaler, scaler_path)
+        joblib.dump(self.scaler, scaler_path, compress=0)
         
         # Save feature columns
         features_path = os.path.join(output_path, f"{model_name}_features.json")
         with open(features_path, "w") as f:
             json.dump(self.feature_columns, f)
         
+        # Save feature statistics for drift detection
+        if self.feature_stats is not None:
+            stats_path = os.path.join(output_path, f"{model_name}_stats.npz")
+            np.savez(stats_path, **self.feature_stats)
+        
         print(f"Model saved to: {model_path}")
+    
+    def save_onnx(self, output_path: str, model_name: str, n_features: int) -> Optional[str]:
+        """
+        Export the fitted model to ONNX for ONNX Runtime serving
+        
+        Args:
+            output_path: Directory to write the model to
+            model_name: Base file name of the exported model
+            n_features: Number of input features
+        
+        Returns:
+            Path to the .onnx file, or None if the model could not be exported
+        """
+        try:
+            import onnx
+            from skl2onnx import convert_sklearn
+            from skl2onnx.common.data_types import FloatTensorType
+        except ImportError:  # pragma: no cover - ONNX export is optional
+            print("⚠️ skl2onnx not installed, skipping ONNX export")
+            return None
+        
+        try:
+            onx = convert_sklearn(
+                self.model,
+                initial_types=[("input", FloatTensorType([None, n_features]))],
+                target_opset=17
+            )
+        except Exception as e:
+            print(f"⚠️ ONNX export failed: {e}")
+            return None
+        
+        onnx_path = os.path.join(output_path, f"{model_name}.onnx")
+        onnx.save_model(onx, onnx_path)
+        print(f"ONNX model saved to: {onnx_path}")
+        
+        return onnx_path
+
+
+def _train_one(
+    splits: Tuple,
+    model_type: str,
+    params: Dict,
+    run_name: str,
+    save_dir: Optional[str] = None,
+    extra_params: Optional[Dict] = None,
+    cv_splits: Optional[int] = None
+) -> Dict:
+    """
+    Train and log a single model in its own predictor
+    
+    Runs in a worker process, so the fitted model is saved from here when
+    save_dir is given rather than being sent back to the parent.
+    
+    Args:
+        splits: Prepared (X_train, X_test, y_train, y_test)
+        model_type: Type of model to train
+        params: Model hyperparameters
+        run_name: Name for MLflow run
+        save_dir: Directory to save the fitted model to, if any
+        extra_params: Additional run parameters to log
+        cv_splits: Number of walk-forward folds to cross-validate, if any
+    
+    Returns:
+        Dictionary with metrics and model info
+    """
+    print(f"\n{'='*60}")
+    print(f"Training {model_type.upper()} model")
+    print(f"{'='*60}")
+    
+    predictor = VolatilityPredictor()
+    result = predictor.train_and_log(
+        None,
+        model_type=model_type,
+        hyperparameters=params,
+        run_name=run_name,
+        prepared=splits,
+        extra_params=extra_params,
+        cv_splits=cv_splits
+    )
+    
+    if save_dir is not None:
+        predictor.save_model_locally(save_dir, "best_model")
+    
+    return result
 
 
 def main():
@@ -331,54 +676,99 @@ def main():
     # Load processed data
     data_path = os.getenv("PROCESSED_DATA_PATH", "./data/processed")
     
-    # Find most recent processed file
-    files = [f for f in os.listdir(data_path) if f.startswith("processed_") and f.endswith(".csv")]
-    if not files:
+    # Find most recent processed file in one directory pass, preferring
+    # Parquet over legacy CSV (scandir entries cache their stat results)
+    with os.scandir(data_path) as entries:
+        latest = max(
+            (
+                entry for entry in entries
+                if entry.name.startswith("processed_") and entry.name.endswith((".parquet", ".csv"))
+            ),
+            key=lambda entry: (entry.name.endswith(".parquet"), entry.stat().st_mtime),
+            default=None
+        )
+    if latest is None:
         print("No processed data found!")
         return
     
-    latest_file = sorted(files)[-1]
-    filepath = os.path.join(data_path, latest_file)
+    filepath = latest.path
     
     print(f"Loading data from: {filepath}")
-    df = pd.read_csv(filepath, index_col=0, parse_dates=True)
+    if filepath.endswith(".parquet"):
+        df = pd.read_parquet(filepath, engine="pyarrow")
+    else:
+        df = pd.read_csv(filepath, index_col=0, parse_dates=True)
     
-    # Train model
-    predictor = VolatilityPredictor()
+    # Optional walk-forward cross-validation of each model (0 disables it)
+    cv_splits = int(os.getenv("CV_SPLITS", "0")) or None
     
     # Train multiple models for comparison
     models = [
         ("random_forest", {"n_estimators": 100, "max_depth": 10}),
         ("gradient_boosting", {"n_estimators": 100, "learning_rate": 0.1}),
+        ("hist_gb", {"max_iter": 200, "learning_rate": 0.05}),
         ("ridge", {"alpha": 1.0})
     ]
     
-    results = []
-    for model_type, params in models:
-        print(f"\n{'='*60}")
-        print(f"Training {model_type.upper()} model")
-        print(f"{'='*60}")
-        
-        result = predictor.train_and_log(
-            df,
-            model_type=model_type,
-            hyperparameters=params,
-            run_name=f"{model_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    from joblib import Parallel, delayed
+    
+    # Features and the train/test split are identical for every model, so
+    # they are computed once and shared with the workers
+    predictor = VolatilityPredictor()
+    X, y = predictor.prepare_features(df)
+    splits = predictor.split_data(X, y)
+    
+    # Create the MLflow experiment before the workers start; workers racing
+    # to create it can register two experiments with the same name
+    predictor._setup_mlflow()
+    
+    # The fits are independent apart from the feature prefilter, so each
+    # stage runs its models in separate processes. The workers' native thread
+    # pools are capped (via loky, leaving this process's environment alone)
+    # so they share the cores without oversubscribing them.
+    first_stage = [(t, p) for t, p in models if t not in PREFILTERED_MODELS]
+    second_stage = [(t, p) for t, p in models if t in PREFILTERED_MODELS]
+    threads_per_model = max(1, (os.cpu_count() or 1) // max(len(first_stage), len(second_stage)))
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    
+    def run_stage(stage, stage_splits, extra_params=None):
+        stage_results = Parallel(n_jobs=len(stage), backend="loky", inner_max_num_threads=threads_per_model)(
+            delayed(_train_one)(
+                stage_splits,
+                model_type,
+                {**params, "n_jobs": threads_per_model} if model_type == "random_forest" else params,
+                f"{model_type}_{timestamp}",
+                # Save best model locally
+                "./models" if model_type == "hist_gb" else None,
+                extra_params,
+                cv_splits
+            )
+            for model_type, params in stage
         )
-        results.append(result)
-        
-        # Save best model locally
-        if model_type == "random_forest":
-            predictor.save_model_locally("./models", "best_model")
+        return {model_type: result for (model_type, _), result in zip(stage, stage_results)}
+    
+    results = run_stage(first_stage, splits)
+    
+    # Keep the random forest's most important features (in column order)
+    # for the models whose cost grows with the feature count
+    importance = results["random_forest"]["feature_importance"]
+    top = set(importance.loc[importance['importance'] > 0, 'feature'].head(N_SELECTED_FEATURES))
+    selected = [col for col in X.columns if col in top]
+    print(f"Selected {len(selected)} of {X.shape[1]} features for {', '.join(PREFILTERED_MODELS)}")
+    
+    X_train, X_test, y_train, y_test = splits
+    selected_splits = (X_train[selected], X_test[selected], y_train, y_test)
+    results.update(run_stage(second_stage, selected_splits, {"selected_features": ",".join(selected)}))
     
     print(f"\n{'='*60}")
     print("TRAINING SUMMARY")
     print(f"{'='*60}")
-    for i, (model_type, _) in enumerate(models):
+    for model_type, _ in models:
         print(f"\n{model_type.upper()}:")
-        print(f"  Run ID: {results[i]['run_id']}")
-        print(f"  RMSE: {results[i]['metrics']['rmse']:.6f}")
-        print(f"  R²: {results[i]['metrics']['r2']:.4f}")
+        print(f"  Run ID: {results[model_type]['run_id']}")
+        print(f"  RMSE: {results[model_type]['metrics']['rmse']:.6f}")
+        print(f"  R²: {results[model_type]['metrics']['r2']:.4f}")
 
 
 if __name__ == "__main__":
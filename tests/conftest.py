@@ -0,0 +1,42 @@
+"""
+Shared pytest fixtures
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+
+
+def generate_sample_data(periods: int, seed: int = 42) -> pd.DataFrame:
+    """Generate deterministic hourly OHLCV sample data"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2024-01-01', periods=periods, freq='1H')
+    
+    # One draw for all price columns, float32 like the extractor's output
+    prices = rng.uniform(100, 200, size=(periods, 4)).astype(np.float32)
+    volume = rng.integers(1000000, 10000000, size=periods, dtype=np.int64)
+    return pd.DataFrame({
+        'open': prices[:, 0],
+        'high': prices[:, 1],
+        'low': prices[:, 2],
+        'close': prices[:, 3],
+        'volume': volume
+    }, index=dates)
+
+
+@pytest.fixture(scope="session")
+def sample_data_factory():
+    """
+    Factory returning a fresh copy of the sample data for a given length
+    
+    Each length is generated once per session; tests get copies, so they
+    can mutate their frame freely.
+    """
+    cache = {}
+    
+    def make(periods: int) -> pd.DataFrame:
+        if periods not in cache:
+            cache[periods] = generate_sample_data(periods)
+        return cache[periods].copy()
+    
+    return make
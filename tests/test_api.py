@@ -0,0 +1,179 @@
+"""
+Unit tests for the prediction API
+"""
+
+import os
+import pytest
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sklearn.ensemble import RandomForestRegressor
+import src.api.app as api
+from src.api.app import FlatForest, ModelService, PredictionRequest
+from src.models.train import VolatilityPredictor
+
+
+@pytest.fixture
+def model_service(tmp_path):
+    """ModelService serving a small random forest saved the way train.py saves it"""
+    rng = np.random.default_rng(0)
+    n = 400
+    X = pd.DataFrame({
+        'returns': rng.normal(0, 0.01, n),
+        'volatility_5': rng.uniform(0.005, 0.02, n),
+        'rsi': rng.uniform(30, 70, n),
+        # Never sent by requests, and far from the 0.0 they are served as
+        'close_ma_5': rng.normal(150, 1, n),
+        'volume_ratio': rng.normal(1, 0.1, n)
+    }).astype(np.float32)
+    y = (X['volatility_5'] * 2 + X['returns'].abs()).astype(np.float32)
+    
+    predictor = VolatilityPredictor()
+    predictor.feature_columns = list(X.columns)
+    predictor.train_model(X, y, "random_forest", {"n_estimators": 20, "n_jobs": 1})
+    predictor.save_model_locally(str(tmp_path), "best_model")
+    
+    return ModelService(model_path=str(tmp_path))
+
+
+def make_request(rng, **overrides):
+    """Random prediction request, with fields optionally overridden"""
+    close = float(rng.uniform(100, 200))
+    fields = {
+        'close': close, 'open': close, 'high': close + 1, 'low': close - 1,
+        'volume': int(rng.integers(1000000, 10000000)),
+        'returns': float(rng.normal(0, 0.01)),
+        'volatility_5': float(rng.uniform(0.005, 0.02)),
+        'rsi': float(rng.uniform(30, 70))
+    }
+    fields.update(overrides)
+    return PredictionRequest(**fields)
+
+
+def test_flat_forest_matches_sklearn():
+    """Test the flattened forest predicts like RandomForestRegressor"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 6)).astype(np.float32)
+    y = X[:, 0] * 2 + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=300)
+    
+    # Unbounded depth on bootstrapped samples gives trees of different depths
+    # and node counts, so the padded arrays and leaf self-loops are exercised
+    model = RandomForestRegressor(n_estimators=30, min_samples_leaf=3, random_state=0).fit(X, y)
+    depths = {estimator.tree_.max_depth for estimator in model.estimators_}
+    node_counts = {estimator.tree_.node_count for estimator in model.estimators_}
+    assert len(depths) > 1
+    assert len(node_counts) > 1
+    
+    assert FlatForest.supports(model)
+    forest = FlatForest(model)
+    
+    X_new = rng.normal(size=(128, 6)).astype(np.float32)
+    np.testing.assert_allclose(forest.predict(X_new), model.predict(X_new), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(forest.predict(X_new[:1]), model.predict(X_new[:1]), rtol=0, atol=1e-12)
+
+
+def test_receive_alert_opens_log_lazily(tmp_path, monkeypatch):
+    """Test alerts are logged even when the startup hook did not run"""
+    log_dir = tmp_path / "logs"
+    monkeypatch.setattr(api, "ALERT_LOG_DIR", str(log_dir))
+    monkeypatch.setattr(api, "ALERT_LOG_FILE", os.path.join(str(log_dir), "grafana_alerts.log"))
+    monkeypatch.setattr(api, "alert_log", None)
+    
+    # Not used as a context manager, so startup/shutdown hooks do not run
+    client = TestClient(api.app)
+    try:
+        first = client.post("/alerts", json={"title": "first"}).json()
+        second = client.post("/alerts", json={"title": "second"}).json()
+    finally:
+        api.alert_log.close()
+    
+    assert first["status"] == "received"
+    assert second["status"] == "received"
+    contents = (log_dir / "grafana_alerts.log").read_text()
+    assert '"first"' in contents and '"second"' in contents
+
+
+def test_drift_ignores_unsupplied_features(model_service):
+    """Test a request at the training means reports no drift"""
+    assert model_service.mean_vec is not None
+    mean = dict(zip(model_service.feature_columns, model_service.mean_vec.tolist()))
+    fields = {
+        'close': 150.0, 'open': 149.5, 'high': 151.0, 'low': 149.0, 'volume': 5000000,
+        'returns': mean['returns'], 'volatility_5': mean['volatility_5'], 'rsi': mean['rsi']
+    }
+    request = PredictionRequest(**fields)
+    
+    result = model_service.predict_request(request)
+    assert result['drift_detected'] is False
+    assert result['confidence_score'] == 1.0
+    assert model_service.predict_many([request])[0]['drift_detected'] is False
+    
+    # Supplied fields far outside the training range still count as drift
+    drifted = PredictionRequest(**{**fields, 'returns': 1.0})
+    assert model_service.predict_request(drifted)['drift_detected'] is True
+    assert model_service.predict_many([drifted])[0]['drift_detected'] is True
+
+
+def test_single_and_batch_predictions_match(model_service):
+    """Test predict_request and predict_many agree, on both model paths"""
+    rng = np.random.default_rng(1)
+    requests = [make_request(rng) for _ in range(200)]
+    
+    single = [model_service.predict_request(r)['prediction'] for r in requests]
+    # Above FLAT_FOREST_MAX_ROWS the batch goes through sklearn
+    batch = [result['prediction'] for result in model_service.predict_many(requests)]
+    small_batch = [result['prediction'] for result in model_service.predict_many(requests[:10])]
+    
+    np.testing.assert_allclose(batch, single, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(small_batch, single[:10], rtol=0, atol=1e-12)
+    assert model_service.predict_many([]) == []
+
+
+def test_missing_optional_fields_use_defaults(model_service):
+    """Test None optional fields are filled from FEATURE_DEFAULTS"""
+    rng = np.random.default_rng(2)
+    request = make_request(rng, returns=None, volatility_5=None, rsi=None)
+    defaulted = make_request(rng, close=request.close, **ModelService.FEATURE_DEFAULTS)
+    
+    X = model_service.create_batch_features([request])
+    for name, default in ModelService.FEATURE_DEFAULTS.items():
+        assert X[0, model_service._col_index[name]] == default
+    np.testing.assert_array_equal(X, model_service.create_features(request.model_dump()))
+    
+    expected = model_service.predict_request(defaulted)['prediction']
+    assert model_service.predict_request(request)['prediction'] == expected
+    assert model_service.predict_many([request])[0]['prediction'] == expected
+
+
+def test_repeated_request_hits_cache(model_service):
+    """Test a repeated request is served from the cache and counted"""
+    rng = np.random.default_rng(3)
+    request = make_request(rng)
+    hits = REGISTRY.get_sample_value('prediction_cache_hits_total')
+    
+    first = model_service.predict_request(request)
+    assert REGISTRY.get_sample_value('prediction_cache_hits_total') == hits
+    
+    second = model_service.predict_request(request)
+    assert REGISTRY.get_sample_value('prediction_cache_hits_total') == hits + 1
+    assert second['prediction'] == first['prediction']
+    
+    # The dict-based entry point shares the cache
+    model_service.predict(request.model_dump())
+    assert REGISTRY.get_sample_value('prediction_cache_hits_total') == hits + 2
+    
+    model_service.predict_request(make_request(rng))
+    assert REGISTRY.get_sample_value('prediction_cache_hits_total') == hits + 2
+
+
+def test_load_model_rebuilds_cache(model_service):
+    """Test reloading the model drops predictions cached for the old one"""
+    rng = np.random.default_rng(4)
+    model_service.predict_request(make_request(rng))
+    old_cache = model_service._cached_predict
+    assert old_cache.cache_info().currsize == 1
+    
+    model_service.load_model()
+    assert model_service._cached_predict is not old_cache
+    assert model_service._cached_predict.cache_info().currsize == 0
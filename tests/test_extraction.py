@@ -2,7 +2,10 @@
 Unit tests for data extraction module
 """
 
+import json
+import threading
 import pytest
+import httpx
 import pandas as pd
 from unittest.mock import Mock, patch
 from src.data.extract import DataExtractor
@@ -16,14 +19,15 @@ def test_data_extractor_initialization():
     extractor = DataExtractor(api_key="test_key", symbol="AAPL")
     assert extractor.api_key == "test_key"
     assert extractor.symbol == "AAPL"
+    assert extractor.session.get_adapter(extractor.base_url).max_retries.total == 3
 
 
-@patch('src.data.extract.requests.get')
+@patch('src.data.extract.requests.Session.get')
 def test_fetch_intraday_data_success(mock_get):
     """Test successful data fetch"""
     # Mock API response
     mock_response = Mock()
-    mock_response.json.return_value = {
+    mock_response.content = json.dumps({
         "Time Series (60min)": {
             "2024-01-01 09:00:00": {
                 "1. open": "150.0",
@@ -33,7 +37,7 @@ def test_fetch_intraday_data_success(mock_get):
                 "5. volume": "1000000"
             }
         }
-    }
+    }).encode()
     mock_response.raise_for_status = Mock()
     mock_get.return_value = mock_response
     
@@ -45,13 +49,13 @@ def test_fetch_intraday_data_success(mock_get):
     assert 'close' in df.columns
 
 
-@patch('src.data.extract.requests.get')
+@patch('src.data.extract.requests.Session.get')
 def test_fetch_intraday_data_api_error(mock_get):
     """Test API error handling"""
     mock_response = Mock()
-    mock_response.json.return_value = {
+    mock_response.content = json.dumps({
         "Error Message": "Invalid API key"
-    }
+    }).encode()
     mock_get.return_value = mock_response
     
     extractor = DataExtractor(api_key="invalid_key")
@@ -60,6 +64,179 @@ def test_fetch_intraday_data_api_error(mock_get):
         extractor.fetch_intraday_data()
 
 
+class FakeCache:
+    """Minimal in-memory stand-in for the redis client API used by the extractor"""
+    
+    def __init__(self):
+        self.store = {}
+    
+    def get(self, key):
+        return self.store.get(key)
+    
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+    
+    def incr(self, key):
+        self.store[key] = self.store.get(key, 0) + 1
+
+
+@patch('src.data.extract.requests.Session.get')
+def test_fetch_intraday_data_cached(mock_get):
+    """Test repeated fetches are served from the response cache"""
+    mock_response = Mock()
+    mock_response.content = json.dumps({
+        "Time Series (60min)": {
+            "2024-01-01 09:00:00": {
+                "1. open": "150.0",
+                "2. high": "151.0",
+                "3. low": "149.0",
+                "4. close": "150.5",
+                "5. volume": "1000000"
+            }
+        }
+    }).encode()
+    mock_response.raise_for_status = Mock()
+    mock_get.return_value = mock_response
+    
+    cache = FakeCache()
+    extractor = DataExtractor(api_key="test_key", cache=cache)
+    first = extractor.fetch_intraday_data()
+    second = extractor.fetch_intraday_data()
+    
+    assert mock_get.call_count == 1
+    assert cache.store["av:cache:misses"] == 1
+    assert cache.store["av:cache:hits"] == 1
+    pd.testing.assert_frame_equal(first.drop(columns='fetch_timestamp'),
+                                  second.drop(columns='fetch_timestamp'))
+
+
+def test_fetch_intraday_many():
+    """Test concurrent multi-symbol fetch keeps per-symbol results and skips failures"""
+    def handler(request):
+        symbol = request.url.params["symbol"]
+        if symbol == "FAIL":
+            return httpx.Response(200, json={"Error Message": "Invalid API call"})
+        return httpx.Response(200, json={
+            "Time Series (60min)": {
+                "2024-01-01 09:00:00": {
+                    "1. open": "150.0",
+                    "2. high": "151.0",
+                    "3. low": "149.0",
+                    "4. close": "150.5",
+                    "5. volume": "1000000"
+                }
+            }
+        })
+    
+    real_client = httpx.AsyncClient
+    with patch('src.data.extract.httpx.AsyncClient',
+               side_effect=lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)):
+        extractor = DataExtractor(api_key="test_key")
+        frames = extractor.fetch_intraday_many(["AAPL", "FAIL", "MSFT"])
+    
+    assert set(frames) == {"AAPL", "MSFT"}
+    assert (frames["MSFT"]['symbol'] == "MSFT").all()
+    assert frames["AAPL"]['close'].iloc[0] == 150.5
+
+
+def test_fetch_intraday_many_cached():
+    """Test concurrent fetches use the response cache off the event loop thread"""
+    requested = []
+    
+    def handler(request):
+        requested.append(request.url.params["symbol"])
+        return httpx.Response(200, json={
+            "Time Series (60min)": {
+                "2024-01-01 09:00:00": {
+                    "1. open": "150.0",
+                    "2. high": "151.0",
+                    "3. low": "149.0",
+                    "4. close": "150.5",
+                    "5. volume": "1000000"
+                }
+            }
+        })
+    
+    class ThreadRecordingCache(FakeCache):
+        threads = set()
+        
+        def get(self, key):
+            self.threads.add(threading.get_ident())
+            return super().get(key)
+    
+    cache = ThreadRecordingCache()
+    real_client = httpx.AsyncClient
+    with patch('src.data.extract.httpx.AsyncClient',
+               side_effect=lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)):
+        extractor = DataExtractor(api_key="test_key", cache=cache)
+        first = extractor.fetch_intraday_many(["AAPL", "MSFT"])
+        second = extractor.fetch_intraday_many(["AAPL", "MSFT"])
+    
+    assert sorted(requested) == ["AAPL", "MSFT"]
+    assert cache.store["av:cache:misses"] == 2
+    assert cache.store["av:cache:hits"] == 2
+    assert threading.get_ident() not in cache.threads
+    assert second["MSFT"]['close'].iloc[0] == first["MSFT"]['close'].iloc[0]
+
+
+def test_parse_time_series():
+    """Test typed, sorted DataFrame construction from the API payload"""
+    time_series = {
+        "2024-01-02": {
+            "1. open": "151.0", "2. high": "152.0", "3. low": "150.0",
+            "4. close": "151.5", "5. volume": "1200000"
+        },
+        "2024-01-01": {
+            "1. open": "150.0", "2. high": "151.0", "3. low": "149.0",
+            "4. close": "bad", "5. volume": "1000000"
+        }
+    }
+    
+    df = DataExtractor._parse_time_series(time_series)
+    
+    assert list(df.columns) == ['open', 'high', 'low', 'close', 'volume']
+    assert df.index.is_monotonic_increasing
+    assert df['open'].tolist() == [150.0, 151.0]
+    # Malformed values are coerced to NaN rather than failing the fetch
+    assert pd.isna(df['close'].iloc[0])
+    
+    del time_series["2024-01-01"]
+    df = DataExtractor._parse_time_series(time_series)
+    assert df['volume'].dtype == 'uint32'
+    assert df['close'].dtype == 'float32'
+    assert df['close'].iloc[0] == 151.5
+
+
+def test_parse_time_series_missing_field():
+    """Test rows missing a field get NaN instead of failing the parse"""
+    time_series = {
+        "2024-01-01 10:00:00": {
+            "1. open": "150.0", "2. high": "151.0", "3. low": "149.0",
+            "4. close": "150.5", "5. volume": "1000000"
+        },
+        "2024-01-01 09:00:00": {
+            "1. open": "149.0", "2. high": "150.0", "3. low": "148.0",
+            "5. volume": "900000"
+        }
+    }
+    
+    df = DataExtractor._parse_time_series(time_series)
+    
+    assert list(df.columns) == ['open', 'high', 'low', 'close', 'volume']
+    assert df.index.is_monotonic_increasing
+    assert df['open'].tolist() == [149.0, 150.0]
+    assert pd.isna(df['close'].iloc[0])
+    assert df['close'].iloc[1] == 150.5
+    assert df['volume'].tolist() == [900000, 1000000]
+    
+    # A field missing from every row leaves an all-NaN column
+    for row in time_series.values():
+        del row["2. high"]
+    df = DataExtractor._parse_time_series(time_series)
+    assert list(df.columns) == ['open', 'high', 'low', 'close', 'volume']
+    assert df['high'].isna().all()
+
+
 def test_save_raw_data(tmp_path):
     """Test data saving functionality"""
     # Create sample data
@@ -74,5 +251,14 @@ def test_save_raw_data(tmp_path):
     extractor = DataExtractor(api_key="test_key", symbol="TEST")
     filepath = extractor.save_raw_data(df, str(tmp_path))
     
-    assert filepath.endswith('.csv')
-    assert pd.read_csv(filepath).shape[0] == 2
+    assert filepath.endswith('.parquet')
+    loaded_df = pd.read_parquet(filepath)
+    assert loaded_df.shape[0] == 2
+    pd.testing.assert_frame_equal(loaded_df, df)
+    
+    csv_path = extractor.save_raw_data(df, str(tmp_path / "csv"), format="csv")
+    assert csv_path.endswith('.csv')
+    assert pd.read_csv(csv_path, index_col=0).shape == df.shape
+    
+    with pytest.raises(ValueError):
+        extractor.save_raw_data(df, str(tmp_path), format="xlsx")
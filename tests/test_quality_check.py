@@ -8,30 +8,24 @@ import numpy as np
 from src.data.quality_check import DataQualityChecker
 
 
-def create_sample_data(with_issues=False):
-    """Helper to create sample data"""
-    dates = pd.date_range('2024-01-01', periods=200, freq='1H')
-    df = pd.DataFrame({
-        'open': np.random.uniform(100, 200, 200),
-        'high': np.random.uniform(100, 200, 200),
-        'low': np.random.uniform(100, 200, 200),
-        'close': np.random.uniform(100, 200, 200),
-        'volume': np.random.randint(1000000, 10000000, 200)
-    }, index=dates)
-    
-    if with_issues:
-        # Introduce issues
-        df.loc[df.index[0], 'close'] = np.nan  # Null value
-        df.loc[df.index[1], 'close'] = -100    # Negative value
-        df.loc[df.index[2], 'high'] = 50       # High < Low
-        df.loc[df.index[2], 'low'] = 150
-    
+def add_issues(df):
+    """Introduce quality issues into sample data"""
+    df.loc[df.index[0], 'close'] = np.nan  # Null value
+    df.loc[df.index[1], 'close'] = -100    # Negative value
+    df.loc[df.index[2], 'high'] = 50       # High < Low
+    df.loc[df.index[2], 'low'] = 150
     return df
 
 
-def test_check_schema_pass():
+@pytest.fixture
+def sample_data(sample_data_factory):
+    """Sample data for a single test"""
+    return sample_data_factory(200)
+
+
+def test_check_schema_pass(sample_data):
     """Test schema check passes with valid data"""
-    df = create_sample_data()
+    df = sample_data
     checker = DataQualityChecker()
     
     assert checker.check_schema(df) is True
@@ -47,26 +41,26 @@ def test_check_schema_fail():
     assert len(checker.issues) > 0
 
 
-def test_check_null_values_pass():
+def test_check_null_values_pass(sample_data):
     """Test null value check passes"""
-    df = create_sample_data()
+    df = sample_data
     checker = DataQualityChecker(null_threshold=0.01)
     
     assert checker.check_null_values(df) is True
 
 
-def test_check_null_values_fail():
+def test_check_null_values_fail(sample_data):
     """Test null value check fails with too many nulls"""
-    df = create_sample_data()
+    df = sample_data
     df.loc[df.index[:50], 'close'] = np.nan  # 25% nulls
     
     checker = DataQualityChecker(null_threshold=0.01)
     assert checker.check_null_values(df) is False
 
 
-def test_check_value_ranges():
+def test_check_value_ranges(sample_data):
     """Test value range validation"""
-    df = create_sample_data(with_issues=True)
+    df = add_issues(sample_data)
     checker = DataQualityChecker()
     
     result = checker.check_value_ranges(df)
@@ -74,17 +68,17 @@ def test_check_value_ranges():
     assert len(checker.issues) > 0
 
 
-def test_check_temporal_consistency():
+def test_check_temporal_consistency(sample_data):
     """Test temporal consistency check"""
-    df = create_sample_data()
+    df = sample_data
     checker = DataQualityChecker()
     
     assert checker.check_temporal_consistency(df) is True
 
 
-def test_run_all_checks():
+def test_run_all_checks(sample_data):
     """Test running all checks"""
-    df = create_sample_data()
+    df = sample_data
     checker = DataQualityChecker()
     
     all_passed, checks, issues = checker.run_all_checks(df)
@@ -94,12 +88,47 @@ def test_run_all_checks():
     assert len(issues) == 0
 
 
-def test_generate_report():
+def test_generate_report(sample_data):
     """Test report generation"""
-    df = create_sample_data()
+    df = sample_data
     checker = DataQualityChecker()
     
     report = checker.generate_report(df)
     
     assert "DATA QUALITY REPORT" in report
     assert "PASSED" in report or "FAILED" in report
+
+
+def test_generate_report_reuses_results(sample_data):
+    """Test report generation from precomputed check results"""
+    df = sample_data
+    checker = DataQualityChecker()
+    
+    results = (False, {'schema': True, 'value_ranges': False}, ["Found 1 rows where high < low"])
+    report = checker.generate_report(df, results=results)
+    
+    assert "VALUE_RANGES: ✗ FAILED" in report
+    assert "Found 1 rows where high < low" in report
+    assert "OVERALL STATUS: FAILED" in report
+    assert checker.checks_passed == {}
+
+
+def test_run_all_checks_multi_matches_per_symbol(sample_data_factory):
+    """Test the multi-symbol run reports the same results as per-symbol runs"""
+    clean = sample_data_factory(200)
+    clean['high'] = clean[['open', 'close']].max(axis=1) + 1
+    clean['low'] = clean[['open', 'close']].min(axis=1) - 1
+    frames = {
+        'CLEAN': clean,
+        'ISSUES': add_issues(sample_data_factory(200)),
+        'UNSORTED': clean.iloc[::-1]
+    }
+    df_long = pd.concat(frames, names=['symbol', 'timestamp'])
+    
+    results = DataQualityChecker().run_all_checks_multi(df_long)
+    
+    assert list(results) == list(frames)
+    for symbol, df in frames.items():
+        assert results[symbol] == DataQualityChecker().run_all_checks(df)
+    assert results['CLEAN'][0] is True
+    assert results['UNSORTED'][1]['temporal'] is False
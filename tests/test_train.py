@@ -0,0 +1,240 @@
+"""
+Unit tests for model training module
+"""
+
+import os
+import json
+import joblib
+import pytest
+import mlflow
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.metrics import mean_squared_error, mean_absolute_error, mean_absolute_percentage_error, r2_score
+from src.models import train
+from src.models.train import VolatilityPredictor, PREFILTERED_MODELS, N_SELECTED_FEATURES
+
+
+def make_processed_data(n_features: int, n: int = 300) -> pd.DataFrame:
+    """Processed frame of random features plus a target that depends on a few of them"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        rng.normal(size=(n, n_features)).astype(np.float32),
+        columns=[f"feature_{i}" for i in range(n_features)],
+        index=pd.date_range('2024-01-01', periods=n, freq='1H')
+    )
+    df['close'] = 150.0
+    df['target_volatility'] = (0.02 + 0.005 * df['feature_0'] + 0.002 * df['feature_3'] ** 2).astype(np.float32)
+    return df
+
+
+@pytest.fixture
+def processed_data():
+    """Small processed frame with 8 features"""
+    return make_processed_data(8)
+
+
+@pytest.fixture
+def mlflow_tmp(tmp_path, monkeypatch):
+    """Point MLflow at a throwaway local store"""
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", f"file:{tmp_path / 'mlruns'}")
+    monkeypatch.setenv("MODEL_NAME", "test_model")
+    yield
+    mlflow.end_run()
+
+
+def record_fits(predictor, monkeypatch):
+    """Make every model the predictor builds record (model, n_rows) on each fit"""
+    fits = []
+    build = predictor._build_model
+    
+    def recording_build(model_type, params):
+        model = build(model_type, params)
+        fit = model.fit
+        
+        def recording_fit(X, y):
+            fits.append((model, len(X)))
+            return fit(X, y)
+        
+        model.fit = recording_fit
+        return model
+    
+    monkeypatch.setattr(predictor, "_build_model", recording_build)
+    return fits
+
+
+def test_compute_metrics_matches_sklearn():
+    """Test the fused metrics agree with sklearn's metric functions"""
+    rng = np.random.default_rng(0)
+    y_true = pd.Series(rng.uniform(0.005, 0.05, 1000).astype(np.float32))
+    y_pred = (y_true.to_numpy() + rng.normal(0, 0.005, 1000)).astype(np.float32)
+    y_pred_before = y_pred.copy()
+    
+    metrics = VolatilityPredictor._compute_metrics(y_true, y_pred)
+    
+    # sklearn accumulates float32 inputs in float32; the fused pass uses float64
+    np.testing.assert_allclose(metrics['rmse'], np.sqrt(mean_squared_error(y_true, y_pred)), rtol=1e-6)
+    np.testing.assert_allclose(metrics['mae'], mean_absolute_error(y_true, y_pred), rtol=1e-6)
+    np.testing.assert_allclose(metrics['r2'], r2_score(y_true, y_pred), rtol=1e-6)
+    np.testing.assert_allclose(metrics['mape'], mean_absolute_percentage_error(y_true, y_pred) * 100, rtol=1e-6)
+    
+    # The caller's predictions are not modified
+    np.testing.assert_array_equal(y_pred, y_pred_before)
+
+
+def test_compute_metrics_zero_targets():
+    """Test zero targets are left out of MAPE but kept in the other metrics"""
+    rng = np.random.default_rng(1)
+    y = rng.uniform(0.005, 0.05, 200)
+    y[::10] = 0.0
+    y_true = pd.Series(y)
+    y_pred = y + rng.normal(0, 0.005, 200)
+    nonzero = y != 0
+    
+    metrics = VolatilityPredictor._compute_metrics(y_true, y_pred)
+    
+    assert np.isfinite(metrics['mape'])
+    np.testing.assert_allclose(
+        metrics['mape'],
+        mean_absolute_percentage_error(y[nonzero], y_pred[nonzero]) * 100,
+        rtol=1e-10
+    )
+    np.testing.assert_allclose(metrics['mae'], mean_absolute_error(y, y_pred), rtol=1e-10)
+    np.testing.assert_allclose(metrics['r2'], r2_score(y, y_pred), rtol=1e-10)
+    
+    # MAPE is undefined when every target is zero
+    all_zero = VolatilityPredictor._compute_metrics(pd.Series(np.zeros(10)), rng.normal(size=10))
+    assert np.isnan(all_zero['mape'])
+
+
+def test_compute_metrics_constant_target():
+    """Test constant targets follow r2_score's convention"""
+    y_true = pd.Series(np.full(50, 0.02))
+    
+    perfect = VolatilityPredictor._compute_metrics(y_true, np.full(50, 0.02))
+    assert perfect['r2'] == r2_score(y_true, np.full(50, 0.02)) == 1.0
+    assert perfect['rmse'] == 0.0
+    
+    y_pred = np.linspace(0.01, 0.03, 50)
+    imperfect = VolatilityPredictor._compute_metrics(y_true, y_pred)
+    assert imperfect['r2'] == r2_score(y_true, y_pred) == 0.0
+
+
+def test_cross_validate_warm_starts_forest(processed_data, monkeypatch):
+    """Test walk-forward CV grows one forest over expanding windows"""
+    predictor = VolatilityPredictor()
+    X, y = predictor.prepare_features(processed_data)
+    fits = record_fits(predictor, monkeypatch)
+    
+    cv_metrics = predictor.cross_validate(X, y, n_splits=5, hyperparameters={"n_estimators": 12, "n_jobs": 1})
+    
+    assert set(cv_metrics) == {"cv_rmse", "cv_mae", "cv_r2", "cv_mape"}
+    assert len(fits) == 5
+    
+    # Same windows as TimeSeriesSplit, each strictly larger than the last
+    sizes = [n_rows for _, n_rows in fits]
+    assert sizes == [len(train_idx) for train_idx, _ in TimeSeriesSplit(n_splits=5).split(X)]
+    assert all(a < b for a, b in zip(sizes, sizes[1:]))
+    
+    # One warm-started forest, 12 // 5 = 2 new trees per fold
+    model = fits[0][0]
+    assert all(fitted is model for fitted, _ in fits)
+    assert model.warm_start
+    assert model.n_estimators == 10
+    assert len(model.estimators_) == 10
+
+
+def test_cross_validate_refits_other_models(processed_data, monkeypatch):
+    """Test models without warm start get a fresh fit per fold"""
+    predictor = VolatilityPredictor()
+    X, y = predictor.prepare_features(processed_data)
+    fits = record_fits(predictor, monkeypatch)
+    
+    predictor.cross_validate(X, y, n_splits=4, model_type="ridge")
+    
+    assert len(fits) == 4
+    assert len({id(model) for model, _ in fits}) == 4
+    assert [n_rows for _, n_rows in fits] == [len(train_idx) for train_idx, _ in TimeSeriesSplit(n_splits=4).split(X)]
+
+
+def test_train_and_log_cross_validates(processed_data, mlflow_tmp):
+    """Test train_and_log runs and logs CV on the training set when asked"""
+    predictor = VolatilityPredictor(experiment_name="test_cv")
+    result = predictor.train_and_log(
+        processed_data,
+        hyperparameters={"n_estimators": 10, "n_jobs": 1},
+        cv_splits=3
+    )
+    
+    assert set(result["cv_metrics"]) == {"cv_rmse", "cv_mae", "cv_r2", "cv_mape"}
+    run = mlflow.get_run(result["run_id"])
+    assert run.data.params["cv_splits"] == "3"
+    assert run.data.metrics["cv_rmse"] == pytest.approx(result["cv_metrics"]["cv_rmse"])
+    fold_rmse = mlflow.tracking.MlflowClient().get_metric_history(result["run_id"], "cv_fold_rmse")
+    assert sorted(metric.step for metric in fold_rmse) == [0, 1, 2]
+    
+    # Without cv_splits no cross-validation is run
+    assert "cv_metrics" not in predictor.train_and_log(processed_data, hyperparameters={"n_estimators": 10, "n_jobs": 1})
+
+
+def test_main_prefiltered_models_use_selected_features(tmp_path, monkeypatch, mlflow_tmp):
+    """Test prefiltered models are logged with exactly the features they were fit on"""
+    data_dir = tmp_path / "processed"
+    data_dir.mkdir()
+    n_features = N_SELECTED_FEATURES + 8
+    make_processed_data(n_features).to_parquet(data_dir / "processed_test.parquet")
+    monkeypatch.setenv("PROCESSED_DATA_PATH", str(data_dir))
+    monkeypatch.chdir(tmp_path)
+    
+    train.main()
+    
+    mlflow.set_tracking_uri(os.environ["MLFLOW_TRACKING_URI"])
+    runs = mlflow.search_runs(experiment_names=["stock_volatility_prediction"], output_format="list")
+    by_type = {run.data.params["model_type"]: run for run in runs}
+    assert set(by_type) == {"random_forest", "gradient_boosting", "hist_gb", "ridge"}
+    
+    # The forest's most important features, kept in column order
+    forest_run = by_type["random_forest"]
+    importance = pd.read_csv(
+        mlflow.artifacts.download_artifacts(f"{forest_run.info.artifact_uri}/feature_importance.csv")
+    )
+    columns = [f"feature_{i}" for i in range(n_features)]
+    top = set(importance.loc[importance['importance'] > 0, 'feature'].head(N_SELECTED_FEATURES))
+    selected = [col for col in columns if col in top]
+    assert len(selected) == N_SELECTED_FEATURES
+    
+    for model_type, run in by_type.items():
+        expected = selected if model_type in PREFILTERED_MODELS else columns
+        assert run.data.params["n_features"] == str(len(expected))
+        assert mlflow.artifacts.load_dict(f"{run.info.artifact_uri}/feature_columns.json") == expected
+        model = mlflow.sklearn.load_model(f"runs:/{run.info.run_id}/model")
+        assert model.n_features_in_ == len(expected)
+        if model_type in PREFILTERED_MODELS:
+            assert run.data.params["selected_features"] == ",".join(selected)
+        else:
+            assert "selected_features" not in run.data.params
+
+
+def test_train_one_saves_prefiltered_features(tmp_path, mlflow_tmp):
+    """Test a model fit on selected columns is saved with those columns"""
+    predictor = VolatilityPredictor()
+    X, y = predictor.prepare_features(make_processed_data(12))
+    X_train, X_test, y_train, y_test = predictor.split_data(X, y)
+    selected = ["feature_0", "feature_3", "feature_7"]
+    
+    train._train_one(
+        (X_train[selected], X_test[selected], y_train, y_test),
+        "ridge",
+        {"alpha": 1.0},
+        "ridge_test",
+        save_dir=str(tmp_path / "models"),
+        extra_params={"selected_features": ",".join(selected)}
+    )
+    
+    with open(tmp_path / "models" / "best_model_features.json") as f:
+        assert json.load(f) == selected
+    model = joblib.load(tmp_path / "models" / "best_model.pkl")
+    scaler = joblib.load(tmp_path / "models" / "best_model_scaler.pkl")
+    assert model.n_features_in_ == scaler.n_features_in_ == len(selected)
+    with np.load(tmp_path / "models" / "best_model_stats.npz") as stats:
+        assert stats['mean'].shape == (len(selected),)
@@ -4,21 +4,14 @@ Unit tests for data transformation module
 
 import pytest
 import pandas as pd
-import numpy as np
+import pyarrow.parquet as pq
 from src.data.transform import StockDataTransformer
 
 
-def create_sample_data():
-    """Create sample stock data"""
-    dates = pd.date_range('2024-01-01', periods=500, freq='1H')
-    df = pd.DataFrame({
-        'open': np.random.uniform(100, 200, 500),
-        'high': np.random.uniform(100, 200, 500),
-        'low': np.random.uniform(100, 200, 500),
-        'close': np.random.uniform(100, 200, 500),
-        'volume': np.random.randint(1000000, 10000000, 500)
-    }, index=dates)
-    return df
+@pytest.fixture
+def sample_data(sample_data_factory):
+    """Sample data for a single test"""
+    return sample_data_factory(500)
 
 
 def test_transformer_initialization():
@@ -28,9 +21,9 @@ def test_transformer_initialization():
     assert transformer.feature_names == []
 
 
-def test_calculate_returns():
+def test_calculate_returns(sample_data):
     """Test returns calculation"""
-    df = create_sample_data()
+    df = sample_data
     transformer = StockDataTransformer()
     
     df_with_returns = transformer.calculate_returns(df)
@@ -40,9 +33,9 @@ def test_calculate_returns():
     assert len(transformer.feature_names) > 0
 
 
-def test_calculate_volatility():
+def test_calculate_volatility(sample_data):
     """Test volatility calculation"""
-    df = create_sample_data()
+    df = sample_data
     transformer = StockDataTransformer()
     
     df = transformer.calculate_returns(df)
@@ -52,9 +45,9 @@ def test_calculate_volatility():
     assert 'volatility_10' in df_with_vol.columns
 
 
-def test_create_lag_features():
+def test_create_lag_features(sample_data):
     """Test lag feature creation"""
-    df = create_sample_data()
+    df = sample_data
     transformer = StockDataTransformer()
     
     df_with_lags = transformer.create_lag_features(
@@ -66,9 +59,9 @@ def test_create_lag_features():
     assert 'close_lag_3' in df_with_lags.columns
 
 
-def test_create_rolling_features():
+def test_create_rolling_features(sample_data):
     """Test rolling feature creation"""
-    df = create_sample_data()
+    df = sample_data
     transformer = StockDataTransformer()
     
     df_with_rolling = transformer.create_rolling_features(df, windows=[5, 10])
@@ -78,9 +71,9 @@ def test_create_rolling_features():
     assert 'bb_upper_5' in df_with_rolling.columns
 
 
-def test_create_technical_indicators():
+def test_create_technical_indicators(sample_data):
     """Test technical indicator creation"""
-    df = create_sample_data()
+    df = sample_data
     transformer = StockDataTransformer()
     
     df_with_indicators = transformer.create_technical_indicators(df)
@@ -90,9 +83,9 @@ def test_create_technical_indicators():
     assert 'macd_signal' in df_with_indicators.columns
 
 
-def test_create_time_features():
+def test_create_time_features(sample_data):
     """Test time feature creation"""
-    df = create_sample_data()
+    df = sample_data
     transformer = StockDataTransformer()
     
     df_with_time = transformer.create_time_features(df)
@@ -103,9 +96,9 @@ def test_create_time_features():
     assert 'hour_cos' in df_with_time.columns
 
 
-def test_create_target_variable():
+def test_create_target_variable(sample_data):
     """Test target variable creation"""
-    df = create_sample_data()
+    df = sample_data
     transformer = StockDataTransformer()
     
     df = transformer.calculate_returns(df)
@@ -115,9 +108,9 @@ def test_create_target_variable():
     assert 'future_returns' in df_with_target.columns
 
 
-def test_transform_full_pipeline():
+def test_transform_full_pipeline(sample_data):
     """Test full transformation pipeline"""
-    df = create_sample_data()
+    df = sample_data
     transformer = StockDataTransformer()
     
     df_transformed = transformer.transform(df, horizon=1)
@@ -135,9 +128,9 @@ def test_transform_full_pipeline():
     assert df_transformed.isnull().sum().sum() == 0
 
 
-def test_save_processed_data(tmp_path):
+def test_save_processed_data(sample_data, tmp_path):
     """Test saving processed data"""
-    df = create_sample_data()
+    df = sample_data
     transformer = StockDataTransformer()
     df_transformed = transformer.transform(df)
     
@@ -145,6 +138,11 @@ def test_save_processed_data(tmp_path):
         df_transformed, str(tmp_path), "TEST"
     )
     
-    assert filepath.endswith('.csv')
-    loaded_df = pd.read_csv(filepath, index_col=0, parse_dates=True)
+    assert filepath.endswith('.parquet')
+    loaded_df = pd.read_parquet(filepath, engine='pyarrow')
     assert loaded_df.shape[0] == df_transformed.shape[0]
+    assert loaded_df.index.equals(df_transformed.index)
+    assert (loaded_df.dtypes == df_transformed.dtypes).all()
+    
+    metadata = pq.ParquetFile(filepath).metadata
+    assert metadata.row_group(0).column(0).compression == 'ZSTD'